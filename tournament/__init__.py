@@ -0,0 +1,81 @@
+"""Round-robin tournament engine for the bots in ``submissions/``."""
+
+from .budget import Budget, BudgetExceeded
+from .cache import ResultCache, result_key
+from .cycles import CycleDetector
+from .entropy import EntropyPool
+from .fsm import Machine, MachineBot, compile_strategy, play_machines
+from .history import HistoryBuffer, HistoryView, PackedTrace, RoundEntry, SequenceView
+from .instrument import TurnProfile, format_report
+from .loader import Entrant, Submission, discover_strategies, load_submission
+from .match import (
+    ENGINE_VERSION,
+    MOVE_BITS,
+    MOVES,
+    PAYOFFS,
+    ROUNDS,
+    MatchResult,
+    StrategyError,
+    forfeit,
+    play_match,
+)
+from .memory import MemoryMeter, MemoryProfile, format_memory_report
+from .periods import PeriodDetector
+from .rng import BotRandom, derive_seed, match_seed
+from .stats import OpponentStats
+from .supervisor import SupervisedPool
+from .tournament import TournamentResult, noise_sweep, pairings, replay, run_tournament
+from .traces import Run, RunTrace, Trace, TraceKey, TraceStore, TraceWriter
+
+__all__ = [
+    "ENGINE_VERSION",
+    "MOVES",
+    "MOVE_BITS",
+    "PAYOFFS",
+    "ROUNDS",
+    "BotRandom",
+    "Budget",
+    "BudgetExceeded",
+    "CycleDetector",
+    "EntropyPool",
+    "Entrant",
+    "HistoryBuffer",
+    "HistoryView",
+    "Machine",
+    "MachineBot",
+    "MatchResult",
+    "MemoryMeter",
+    "MemoryProfile",
+    "OpponentStats",
+    "PackedTrace",
+    "PeriodDetector",
+    "ResultCache",
+    "RoundEntry",
+    "Run",
+    "RunTrace",
+    "StrategyError",
+    "SupervisedPool",
+    "SequenceView",
+    "Submission",
+    "Trace",
+    "TraceKey",
+    "TraceStore",
+    "TraceWriter",
+    "TournamentResult",
+    "TurnProfile",
+    "compile_strategy",
+    "derive_seed",
+    "discover_strategies",
+    "forfeit",
+    "format_memory_report",
+    "format_report",
+    "load_submission",
+    "match_seed",
+    "noise_sweep",
+    "pairings",
+    "play_machines",
+    "play_match",
+    "replay",
+    "result_key",
+    "run_tournament",
+]
@@ -0,0 +1,171 @@
+import argparse
+import sys
+from pathlib import Path
+
+from .cache import RESULTS_DIR, ResultCache
+from .cli import add_budget_arguments, budget_from, print_sweep
+from .instrument import format_report
+from .loader import SUBMISSIONS_DIR, discover_strategies
+from .match import ROUNDS
+from .memory import format_memory_report
+from .tournament import noise_sweep, replay, run_tournament
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m tournament",
+        description="Play every submission against every other submission.",
+    )
+    parser.add_argument("--submissions", type=Path, default=SUBMISSIONS_DIR)
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        metavar="N",
+        help="matches each process keeps in flight on threads, for bots that block on I/O",
+    )
+    parser.add_argument(
+        "--no-compile",
+        dest="compile_bots",
+        action="store_false",
+        help="play every bot through turn(), even ones that compile to a state machine",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="time every turn() call and report per-bot latency and growth",
+    )
+    parser.add_argument(
+        "--profile-every",
+        type=int,
+        default=0,
+        metavar="N",
+        help="with --instrument, run every N-th turn under cProfile",
+    )
+    parser.add_argument("--repetitions", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--traces",
+        type=Path,
+        metavar="DIR",
+        help="write every match's moves to a trace store in DIR",
+    )
+    parser.add_argument(
+        "--noise",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        metavar="EPS",
+        help="flip every move with probability EPS; several values run a noise sweep",
+    )
+    parser.add_argument(
+        "--cache",
+        type=Path,
+        default=RESULTS_DIR,
+        metavar="DIR",
+        help="reuse and store match results in DIR (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_const",
+        const=None,
+        help="play every match, without reading or writing the result cache",
+    )
+    add_budget_arguments(parser)
+    parser.add_argument(
+        "--memory-every",
+        type=int,
+        default=0,
+        metavar="N",
+        help="measure the memory every bot holds in every N-th match, with tracemalloc",
+    )
+    parser.add_argument(
+        "--replay",
+        nargs=2,
+        metavar=("BOT_A", "BOT_B"),
+        help="replay one match of the tournament with this --seed on this core",
+    )
+    parser.add_argument(
+        "--repetition", type=int, default=0, help="which repetition --replay plays"
+    )
+    args = parser.parse_args()
+    if args.traces is not None and len(args.noise) > 1:
+        parser.error("--traces records one tournament; give a single --noise value")
+
+    entrants = discover_strategies(args.submissions)
+    budget = budget_from(args)
+    if args.replay:
+        name_a, name_b = args.replay
+        match = replay(
+            entrants,
+            name_a,
+            name_b,
+            args.rounds,
+            args.seed,
+            args.repetition,
+            args.noise[0],
+            budget,
+        )
+        if match.forfeit is not None:
+            print(f"{args.replay[match.forfeit]} forfeited: {match.reason}")
+        print(f"{name_a}: {match.score_a}")
+        print(f"{name_b}: {match.score_b}")
+        return
+
+    cache = ResultCache(args.cache) if args.cache is not None else None
+    if len(args.noise) > 1:
+        sweep = noise_sweep(
+            entrants,
+            args.noise,
+            args.rounds,
+            args.processes,
+            args.compile_bots,
+            args.instrument or args.profile_every > 0,
+            args.profile_every,
+            args.repetitions,
+            args.seed,
+            cache,
+            args.concurrency,
+            budget,
+            args.memory_every,
+        )
+        print_sweep(sweep)
+        return
+
+    result = run_tournament(
+        entrants,
+        args.rounds,
+        args.processes,
+        args.compile_bots,
+        args.instrument or args.profile_every > 0,
+        args.profile_every,
+        args.repetitions,
+        args.seed,
+        args.traces,
+        args.noise[0],
+        cache,
+        args.concurrency,
+        budget,
+        args.memory_every,
+    )
+    if result.cached:
+        print(f"reused {result.cached} cached matches", file=sys.stderr)
+
+    for (i, j, repetition), error in sorted(result.errors.items()):
+        print(f"{result.names[i]} vs {result.names[j]} (repetition {repetition}): {error}")
+    width = max((len(name) for name in result.names), default=0)
+    for rank, (name, total) in enumerate(result.leaderboard(), 1):
+        print(f"{rank:>3}. {name:<{width}}  {total}")
+    if result.profiles:
+        print()
+        print(format_report(result.profiles))
+    if result.memory:
+        print()
+        print(format_memory_report(result.memory))
+
+
+if __name__ == "__main__":
+    main()
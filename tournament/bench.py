@@ -0,0 +1,201 @@
+"""Benchmarks for the match engine and for every submission.
+
+Micro-benchmarks time the engine's own overhead with null bots that never look
+at the history: whole-match rounds per second, HistoryBuffer append and view
+cost, and payoff lookup cost. The macro benchmark plays every bot in
+``submissions/`` against each reference strategy for a full match.
+
+Results are written as JSON with host and commit metadata, so runs can be
+compared across commits and machines::
+
+    python -m tournament.bench --output before.json
+    python -m tournament.bench --output after.json --compare before.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from ping_game_theory import History, Move, Strategy
+
+from .fsm import Machine, play_machines
+from .history import HistoryBuffer
+from .loader import SUBMISSIONS_DIR, discover_strategies
+from .match import PAYOFFS, ROUNDS, StrategyError, play_match
+from .reference import REFERENCE_POOL
+from .rng import match_seed
+
+
+class NullBot(Strategy):
+    """Cooperates without reading the history, so only the engine is timed."""
+
+    def begin(self) -> Move:
+        return Move.COOPERATE
+
+    def turn(self, history: History) -> Move:
+        return Move.COOPERATE
+
+
+def _best_of(repeat: int, fn: Callable[[], None]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def micro_benchmarks(rounds: int = ROUNDS, repeat: int = 5) -> Dict[str, float]:
+    """Engine overhead, as rates and per-operation nanoseconds."""
+    results: Dict[str, float] = {}
+
+    seconds = _best_of(repeat, lambda: play_match(NullBot, NullBot, rounds))
+    results["match_rounds_per_sec"] = rounds / seconds
+
+    machine = Machine((0,), ((0, 0),))
+    seconds = _best_of(repeat, lambda: play_machines(machine, machine, rounds, extrapolate=False))
+    results["machine_rounds_per_sec"] = rounds / seconds
+
+    def append() -> None:
+        buffer = HistoryBuffer()
+        for _ in range(rounds):
+            buffer.append(Move.COOPERATE, Move.DEFECT)
+
+    results["history_append_ns"] = _best_of(repeat, append) / rounds * 1e9
+
+    buffer = HistoryBuffer()
+    for _ in range(rounds):
+        buffer.append(Move.COOPERATE, Move.DEFECT)
+
+    def view() -> None:
+        for _ in range(rounds):
+            buffer.view()
+
+    results["history_view_ns"] = _best_of(repeat, view) / rounds * 1e9
+
+    moves = [(Move.COOPERATE, Move.DEFECT), (Move.DEFECT, Move.DEFECT)] * (rounds // 2)
+
+    def score() -> None:
+        total_a = total_b = 0
+        for move_a, move_b in moves:
+            payoff_a, payoff_b = PAYOFFS[move_a][move_b]
+            total_a += payoff_a
+            total_b += payoff_b
+
+    results["scoring_ns"] = _best_of(repeat, score) / max(len(moves), 1) * 1e9
+    return results
+
+
+def macro_benchmarks(
+    directory: Path = SUBMISSIONS_DIR, rounds: int = ROUNDS, seed: int = 0
+) -> Dict[str, Dict[str, object]]:
+    """Seconds each submission takes for one match against each reference bot.
+
+    Every match is seeded from ``seed`` (see ``rng``), so random bots play the
+    same game in every run.
+    """
+    results: Dict[str, Dict[str, object]] = {}
+    for entrant in discover_strategies(directory):
+        cls = entrant.load()
+        timings: Dict[str, object] = {}
+        for reference in REFERENCE_POOL:
+            start = time.perf_counter()
+            try:
+                play_match(
+                    cls,
+                    reference,
+                    rounds,
+                    seed=match_seed(seed, entrant.name, reference.__name__),
+                )
+            except StrategyError as exc:
+                timings[reference.__name__] = {"error": str(exc)}
+                continue
+            timings[reference.__name__] = {"seconds": time.perf_counter() - start}
+        results[entrant.name] = timings
+    return results
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def metadata() -> Dict[str, object]:
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "commit": _commit(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+    }
+
+
+def _flatten(report: dict) -> Dict[str, float]:
+    flat = {f"micro.{k}": v for k, v in report.get("micro", {}).items()}
+    for bot, timings in report.get("macro", {}).items():
+        for reference, timing in timings.items():
+            if "seconds" in timing:
+                flat[f"macro.{bot}.{reference}"] = timing["seconds"]
+    return flat
+
+
+def compare(old: dict, new: dict) -> List[str]:
+    """``new / old`` for every measurement present in both reports."""
+    before, after = _flatten(old), _flatten(new)
+    lines = []
+    for key in sorted(before.keys() & after.keys()):
+        if before[key]:
+            lines.append(f"{key:<70} {after[key] / before[key]:>7.2f}x")
+    return lines
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m tournament.bench")
+    parser.add_argument("--rounds", type=int, default=ROUNDS)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0, help="seed of the macro benchmark's matches")
+    parser.add_argument("--submissions", type=Path, default=SUBMISSIONS_DIR)
+    parser.add_argument("--micro-only", action="store_true")
+    parser.add_argument("--output", type=Path, help="write JSON here instead of stdout")
+    parser.add_argument("--compare", type=Path, help="earlier JSON report to compare with")
+    args = parser.parse_args(argv)
+
+    report: Dict[str, object] = {
+        "meta": metadata(),
+        "rounds": args.rounds,
+        "seed": args.seed,
+        "micro": micro_benchmarks(args.rounds, args.repeat),
+    }
+    if not args.micro_only:
+        report["macro"] = macro_benchmarks(args.submissions, args.rounds, args.seed)
+
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        args.output.write_text(text + "\n")
+    if args.compare is not None:
+        print("\n".join(compare(json.loads(args.compare.read_text()), report)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""Time and CPU budgets for bots, enforced without stalling the worker.
+
+One slow or stuck bot used to hold its worker for as long as it liked: a
+network call, a sleep, or an endless loop in turn(). With a Budget, every
+call into a bot (construction, begin(), turn()) is metered, per turn and
+summed over the match, in wall time and in the calling thread's CPU time. A
+call over budget forfeits the match for its bot (see ``tournament``).
+
+A call that has not returned by its deadline is interrupted. A per-process
+watchdog thread raises Interrupted inside it, and wakes it with SIGALRM if it
+sleeps on the main thread. Interrupted derives from BaseException, so the
+bot's ``except Exception`` blocks do not swallow it. If the call still has
+not returned ``STUCK_GRACE`` seconds later (a sleep on any thread but the
+main one only sees the exception once it wakes), the watchdog reports the
+match to the supervising pool, if there is one, and ends the worker process.
+The pool then records the forfeit and replays that worker's other matches on
+a fresh process (see ``supervisor``).
+
+A call that holds the GIL, such as a long C loop, starves the watchdog too.
+For those, every Meter in a pool worker keeps a Beacon in shared memory with
+its match, the side in a call and that call's hard deadline: its budget plus
+``HARD_SLACK`` seconds. The pool kills a worker whose call is past its hard
+deadline and settles the match from the Beacon. A budget with only CPU limits
+gives each call a hard deadline that long in wall time, so a call that sleeps
+that long is killed as well.
+"""
+
+import ctypes
+import functools
+import math
+import os
+import pickle
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple
+
+# How often the watchdog looks at running calls, in seconds.
+POLL_INTERVAL = 0.02
+# How long an interrupted call may take to unwind before the process ends.
+STUCK_GRACE = 2.0
+# How long past its budget a call may run before the pool kills its worker.
+HARD_SLACK = 5 * STUCK_GRACE
+# Bytes of a pickled Meter label a Beacon holds; longer labels are not shown.
+LABEL_SIZE = 112
+
+_INF = math.inf
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Seconds (and bytes) each bot may spend; None means unlimited.
+
+    ``turn_*`` limits every single call into the bot. ``match_*`` limits the
+    sum of the bot's calls over one match. ``memory`` caps the bytes a bot
+    may hold at any point of a match (see ``memory``).
+    """
+
+    turn_time: Optional[float] = None
+    turn_cpu: Optional[float] = None
+    match_time: Optional[float] = None
+    match_cpu: Optional[float] = None
+    memory: Optional[int] = None
+
+    def key(self) -> List[Optional[float]]:
+        """The limits as a JSON-friendly list, for cache keys."""
+        return [self.turn_time, self.turn_cpu, self.match_time, self.match_cpu, self.memory]
+
+
+class BudgetExceeded(Exception):
+    """A call into a bot went over its budget."""
+
+    def __init__(self, side: int, message: str) -> None:
+        super().__init__(message)
+        self.side = side
+
+
+class Interrupted(BaseException):
+    """Raised by the watchdog inside a call that is past its deadline."""
+
+
+# (label, side, reason) of a call that would not stop, for the supervisor.
+Report = Tuple[Hashable, int, str]
+
+_reporter: Optional[Callable[[Report], None]] = None
+
+
+class Beacon(ctypes.Structure):
+    """One Meter's call in progress, in memory shared with the supervisor.
+
+    The supervising process reads it while the worker holds the GIL.
+    ``deadline`` is on the ``perf_counter`` clock, which is CLOCK_MONOTONIC
+    and so the same in every process.
+    """
+
+    _fields_ = [
+        ("pid", ctypes.c_int),
+        ("in_use", ctypes.c_bool),
+        ("side", ctypes.c_int),
+        ("deadline", ctypes.c_double),
+        ("size", ctypes.c_int),
+        ("label", ctypes.c_ubyte * LABEL_SIZE),
+    ]
+
+    def overdue(self, now: float) -> bool:
+        return self.in_use and self.deadline < now
+
+    def report(self, reason: str) -> Report:
+        label = pickle.loads(bytes(self.label[: self.size])) if self.size else None
+        return label, self.side, reason
+
+
+_beacons: List[Beacon] = []
+_beacons_lock = threading.Lock()
+
+
+def install_reporter(
+    reporter: Optional[Callable[[Report], None]], beacons: Sequence[Beacon] = ()
+) -> None:
+    """Let the watchdog end this process over a stuck call, after ``reporter``.
+
+    Meters show their calls in ``beacons``, one per Meter alive at a time.
+    """
+    global _reporter, _beacons
+    _reporter = reporter
+    pid = os.getpid()
+    for beacon in beacons:
+        beacon.pid = pid
+        beacon.in_use = False
+    _beacons = list(beacons)
+
+
+def _claim_beacon(label: Hashable) -> Optional[Beacon]:
+    data = pickle.dumps(label)
+    with _beacons_lock:
+        for beacon in _beacons:
+            if not beacon.in_use:
+                beacon.deadline = _INF
+                beacon.size = len(data) if len(data) <= LABEL_SIZE else 0
+                ctypes.memmove(beacon.label, data, beacon.size)
+                beacon.in_use = True
+                return beacon
+    return None
+
+
+def _interrupt(thread: int, wake: bool) -> None:
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread), ctypes.py_object(Interrupted)
+    )
+    if wake:
+        # Cut short a sleep or blocking read on the main thread; the pending
+        # exception is raised as soon as the signal handler runs.
+        signal.pthread_kill(thread, signal.SIGALRM)
+
+
+def _cancel_interrupt(thread: int) -> None:
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(thread), None)
+
+
+class _Slot:
+    # The call a Meter's thread is in, as seen by the watchdog.
+    __slots__ = ("thread", "clock", "label", "side", "deadline", "cpu_deadline", "fired", "lock")
+
+    def __init__(self, label: Hashable, cpu: bool) -> None:
+        self.thread = threading.get_ident()
+        self.clock = time.pthread_getcpuclockid(self.thread) if cpu else None
+        self.label = label
+        self.side = 0
+        self.deadline = _INF
+        self.cpu_deadline = _INF
+        # perf_counter() time the watchdog interrupted the call, or 0.
+        self.fired = 0.0
+        self.lock = threading.Lock()
+
+    def disarm(self) -> bool:
+        """End the current call; True if the watchdog interrupted it."""
+        with self.lock:
+            self.deadline = self.cpu_deadline = _INF
+            fired, self.fired = self.fired, 0.0
+            if fired:
+                _cancel_interrupt(self.thread)
+        return bool(fired)
+
+
+class _Watchdog:
+    def __init__(self) -> None:
+        self.slots: List[_Slot] = []
+        self.lock = threading.Lock()
+        # The main thread can only be woken if we own its SIGALRM handler.
+        self.main = None
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGALRM, lambda signum, frame: None)
+            self.main = threading.get_ident()
+        threading.Thread(target=self._run, name="budget-watchdog", daemon=True).start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(POLL_INTERVAL)
+            now = time.perf_counter()
+            with self.lock:
+                slots = list(self.slots)
+            for slot in slots:
+                with slot.lock:
+                    if slot.fired:
+                        if now - slot.fired > STUCK_GRACE and _reporter is not None:
+                            reason = "did not return after its budget ran out"
+                            _reporter((slot.label, slot.side, reason))
+                            os._exit(1)
+                        continue
+                    over = now > slot.deadline
+                    if not over and slot.clock is not None and slot.cpu_deadline < _INF:
+                        over = time.clock_gettime(slot.clock) > slot.cpu_deadline
+                    if over:
+                        slot.fired = now
+                        _interrupt(slot.thread, slot.thread == self.main)
+
+
+_watchdog: Optional[_Watchdog] = None
+_watchdog_lock = threading.Lock()
+
+
+def _forget_watchdog() -> None:
+    # A forked child inherits the watchdog but not its thread.
+    global _watchdog, _watchdog_lock
+    _watchdog = None
+    _watchdog_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_watchdog)
+
+
+def _get_watchdog() -> _Watchdog:
+    global _watchdog
+    with _watchdog_lock:
+        if _watchdog is None:
+            _watchdog = _Watchdog()
+        return _watchdog
+
+
+class Meter:
+    """Both sides' spending in one match, played on the thread that creates it.
+
+    ``label`` identifies the match in the watchdog's reports.
+    """
+
+    def __init__(self, budget: Budget, label: Hashable = None) -> None:
+        self.budget = budget
+        # Seconds each side has spent so far, wall and CPU.
+        self.time = [0.0, 0.0]
+        self.cpu = [0.0, 0.0]
+        self._turn_time = _INF if budget.turn_time is None else budget.turn_time
+        self._turn_cpu = _INF if budget.turn_cpu is None else budget.turn_cpu
+        self._match_time = _INF if budget.match_time is None else budget.match_time
+        self._match_cpu = _INF if budget.match_cpu is None else budget.match_cpu
+        self._watchdog = _get_watchdog()
+        self._slot = _Slot(label, self._turn_cpu < _INF or self._match_cpu < _INF)
+        with self._watchdog.lock:
+            self._watchdog.slots.append(self._slot)
+        self._beacon = _claim_beacon(label) if _beacons else None
+
+    def close(self) -> None:
+        with self._watchdog.lock:
+            self._watchdog.slots.remove(self._slot)
+        if self._beacon is not None:
+            with _beacons_lock:
+                self._beacon.in_use = False
+
+    def wrap(self, side: int, fn: Callable) -> Callable:
+        """``fn``, metered against ``side``'s budget."""
+
+        @functools.wraps(fn)
+        def metered(*args: Any) -> Any:
+            return self.run(side, fn, args)
+
+        return metered
+
+    def run(self, side: int, fn: Callable, args: tuple) -> Any:
+        wall_limit = min(self._turn_time, self._match_time - self.time[side])
+        cpu_limit = min(self._turn_cpu, self._match_cpu - self.cpu[side])
+        slot = self._slot
+        slot.side = side
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        slot.cpu_deadline = cpu_start + cpu_limit
+        slot.deadline = start + wall_limit
+        beacon = self._beacon
+        if beacon is not None:
+            beacon.side = side
+            beacon.deadline = start + min(wall_limit, cpu_limit) + HARD_SLACK
+        try:
+            try:
+                result = fn(*args)
+            finally:
+                fired = slot.disarm()
+                if beacon is not None:
+                    beacon.deadline = _INF
+        except Interrupted:
+            slot.disarm()
+            fired = True
+        wall = time.perf_counter() - start
+        cpu = time.thread_time() - cpu_start
+        self.time[side] += wall
+        self.cpu[side] += cpu
+        if fired or wall > wall_limit or cpu > cpu_limit:
+            raise BudgetExceeded(side, self._overrun(side, wall, cpu))
+        return result
+
+    def _overrun(self, side: int, wall: float, cpu: float) -> str:
+        if wall > self._turn_time:
+            return f"took {wall:.3g}s, over the {self._turn_time:g}s per-turn budget"
+        if cpu > self._turn_cpu:
+            return f"used {cpu:.3g}s of CPU, over the {self._turn_cpu:g}s per-turn budget"
+        if self.time[side] > self._match_time:
+            return f"ran over the {self._match_time:g}s per-match budget"
+        return f"ran over the {self._match_cpu:g}s per-match CPU budget"
@@ -0,0 +1,83 @@
+"""Content-addressed cache of match results.
+
+Submissions arrive one pull request at a time, and a new file changes none of
+the matches between the files already there. Every match result is stored
+under a key hashed from everything that determines it:
+- the contents and class name of both bots,
+- the engine version and payoffs,
+- the round count, match seed, noise level and bot budget.
+The next tournament then only simulates pairings whose key it has not seen.
+Editing a bot changes its digest, which invalidates exactly the pairings it
+plays in.
+
+Entries are small JSON files under ``<directory>/<key[:2]>/<key>.json``,
+written atomically. A cache directory can be copied or rsynced between
+machines and merged by copying one over another.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional, Union
+
+from .budget import Budget
+from .loader import CACHE_DIR, Entrant
+from .match import ENGINE_VERSION, MOVES, PAYOFFS, MatchResult
+
+RESULTS_DIR = CACHE_DIR / "results"
+
+_PAYOFFS = [[PAYOFFS[a][b] for b in MOVES] for a in MOVES]
+
+
+def result_key(
+    a: Entrant,
+    b: Entrant,
+    rounds: int,
+    seed: int,
+    noise: float = 0.0,
+    budget: Optional[Budget] = None,
+) -> str:
+    """Cache key of the match ``a`` vs ``b`` played with these settings."""
+    parts = [
+        ENGINE_VERSION,
+        _PAYOFFS,
+        a.digest,
+        a.class_name,
+        b.digest,
+        b.class_name,
+        rounds,
+        seed,
+        float(noise),
+        None if budget is None else budget.key(),
+    ]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+class ResultCache:
+    """Match results on disk, keyed by ``result_key``."""
+
+    def __init__(self, directory: Union[str, Path] = RESULTS_DIR) -> None:
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[MatchResult]:
+        try:
+            return MatchResult(**json.loads(self._path(key).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def put(self, key: str, match: MatchResult) -> None:
+        entry = vars(match)
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp, path)
+        except OSError:
+            pass
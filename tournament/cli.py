@@ -0,0 +1,56 @@
+"""Command-line pieces shared by ``python -m tournament`` and ``distributed``."""
+
+import argparse
+from typing import Dict, Optional
+
+from .budget import Budget
+from .instrument import format_report
+from .memory import format_memory_report
+from .tournament import TournamentResult
+
+
+def print_sweep(sweep: Dict[float, TournamentResult]) -> None:
+    """Total score of every bot at every noise level, ranked at the first level."""
+    levels = list(sweep)
+    first = sweep[levels[0]]
+    for level, result in sweep.items():
+        for (i, j, repetition), error in sorted(result.errors.items()):
+            print(
+                f"noise {level}: {result.names[i]} vs {result.names[j]} "
+                f"(repetition {repetition}): {error}"
+            )
+    width = max((len(name) for name in first.names), default=0)
+    print(f"{'bot':<{width}}" + "".join(f"  {level:>10g}" for level in levels))
+    totals = {level: dict(zip(result.names, result.totals())) for level, result in sweep.items()}
+    for name, _ in first.leaderboard():
+        print(f"{name:<{width}}" + "".join(f"  {totals[level][name]:>10}" for level in levels))
+    if first.profiles:
+        print()
+        print(format_report(first.profiles))
+    if first.memory:
+        print()
+        print(format_memory_report(first.memory))
+
+
+def add_budget_arguments(parser: argparse.ArgumentParser) -> None:
+    for flag, what in (
+        ("--turn-time", "wall-clock seconds per call into a bot"),
+        ("--turn-cpu", "CPU seconds per call into a bot"),
+        ("--match-time", "wall-clock seconds per bot per match"),
+        ("--match-cpu", "CPU seconds per bot per match"),
+    ):
+        parser.add_argument(
+            flag, type=float, metavar="SEC", help=f"forfeit bots that use more than SEC {what}"
+        )
+    parser.add_argument(
+        "--memory-cap",
+        type=float,
+        metavar="MB",
+        help="forfeit bots that hold more than MB megabytes during a match",
+    )
+
+
+def budget_from(args: argparse.Namespace) -> Optional[Budget]:
+    memory = None if args.memory_cap is None else int(args.memory_cap * 2**20)
+    limits = (args.turn_time, args.turn_cpu, args.match_time, args.match_cpu, memory)
+    return None if all(limit is None for limit in limits) else Budget(*limits)
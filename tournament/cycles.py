@@ -0,0 +1,86 @@
+"""Skip the rest of a match once both bots are provably going round in circles.
+
+If the joint state of a match (everything that decides the bots' next moves)
+ever repeats, every round from then on repeats with the same period, and the
+remaining scores follow in closed form. The engine feeds a CycleDetector the
+joint state at the start of every round and each round's moves and payoffs.
+
+For two compiled machines the joint state is the pair of machine states, so a
+cycle is found within ``len(a.outputs) * len(b.outputs)`` rounds and is exact.
+Python bots opt in by defining ``fingerprint()``: a hashable summary of every
+bit of internal state that affects their future moves, apart from the last
+round's moves, which the engine adds itself. A bot that reads the history
+further back than the last round must include what it reads. Because a wrong
+fingerprint would silently change the score, the detector plays
+``checks`` more cycles and compares them with the prediction before it
+extrapolates; any mismatch switches it off for the rest of the match.
+"""
+
+from typing import Dict, Hashable, List, Optional, Tuple
+
+SPOT_CHECK_CYCLES = 3
+
+
+class CycleDetector:
+    """Finds the first repeated joint state of a match and extrapolates from it."""
+
+    __slots__ = (
+        "rounds",
+        "checks",
+        "active",
+        "_seen",
+        "_codes",
+        "_payoffs",
+        "_start",
+        "_period",
+        "_check_until",
+    )
+
+    def __init__(self, rounds: int, checks: int = 0) -> None:
+        self.rounds = rounds
+        self.checks = checks
+        # False once a spot check failed; the engine should stop calling in.
+        self.active = True
+        self._seen: Dict[Hashable, int] = {}
+        self._codes: List[int] = []
+        self._payoffs: List[Tuple[int, int]] = []
+        self._start = 0
+        self._period = 0
+        self._check_until = 0
+
+    def check(self, state: Hashable) -> Optional[Tuple[int, int]]:
+        """Call with the joint state at the start of the next round.
+
+        Returns the two sides' total payoff over every remaining round once a
+        cycle is found and has passed its spot checks, else None.
+        """
+        t = len(self._codes)
+        if not self._period:
+            start = self._seen.setdefault(state, t)
+            if start == t:
+                return None
+            self._start, self._period = start, t - start
+            self._check_until = t + self.checks * self._period
+            self._seen.clear()
+        if t < self._check_until:
+            return None
+        return self._tail(t)
+
+    def record(self, code: int, payoff_a: int, payoff_b: int) -> None:
+        """Call after every round with its move code ``2 * a + b`` and payoffs."""
+        if self._period and self._codes[-self._period] != code:
+            self.active = False
+        self._codes.append(code)
+        self._payoffs.append((payoff_a, payoff_b))
+
+    def _tail(self, t: int) -> Tuple[int, int]:
+        cycle = self._payoffs[self._start : self._start + self._period]
+        full, rest = divmod(self.rounds - t, self._period)
+        phase = (t - self._start) % self._period
+        total_a = full * sum(a for a, _ in cycle)
+        total_b = full * sum(b for _, b in cycle)
+        for k in range(rest):
+            a, b = cycle[(phase + k) % self._period]
+            total_a += a
+            total_b += b
+        return total_a, total_b
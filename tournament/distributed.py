@@ -0,0 +1,425 @@
+"""Run one tournament across several hosts.
+
+A coordinator splits the (pairing, repetition) space into fixed shards. Each
+shard is a contiguous run of the canonical order used by ``run_tournament``,
+so the split depends only on the entrants and settings. Workers connect over
+TCP, check that they see the same submissions (by name and SHA-256), then
+repeatedly pull a shard, play it, and send back one compact row per
+(pairing, repetition): the match result at every noise level. The
+coordinator merges the rows into the same payoff matrix a single-node run
+produces. Every match is seeded from the tournament seed, so it does not
+matter which worker plays it. A shard held by a worker that disconnects is
+handed to the next worker that asks. A coordinator that started its own
+workers gives up once all of them have exited with shards left unplayed.
+
+The wire format is one JSON object per line::
+
+    python -m tournament.distributed coordinate --port 7420 --rounds 10000
+    python -m tournament.distributed worker --connect coordinator-host:7420
+
+``run_distributed`` starts a coordinator and local worker processes on
+localhost, for testing and for single-machine use.
+"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, TextIO, Tuple
+
+from .budget import Budget
+from .cli import add_budget_arguments, budget_from, print_sweep
+from .entropy import EntropyPool
+from .fsm import Machine
+from .loader import SUBMISSIONS_DIR, Entrant, discover_strategies
+from .match import ROUNDS, MatchResult
+from .rng import match_seed
+from .supervisor import SupervisedPool
+from .tournament import (
+    Outcome,
+    Pairing,
+    TournamentResult,
+    compile_entrant,
+    init_worker,
+    pairings,
+    record_matches,
+    run_pairing,
+    settle_pairing,
+)
+
+SHARD_SIZE = 16
+# How often a coordinator checks on the worker processes it started, in seconds.
+WORKER_POLL = 0.5
+
+Unit = Tuple[int, int, int]
+
+
+def shards(n: int, repetitions: int, size: int = SHARD_SIZE) -> List[List[Unit]]:
+    """The (i, j, repetition) units of a tournament, in fixed chunks of ``size``."""
+    units = [(i, j, r) for i, j in pairings(n) for r in range(repetitions)]
+    return [units[k : k + size] for k in range(0, len(units), size)]
+
+
+def _send(stream: TextIO, message: dict) -> None:
+    stream.write(json.dumps(message) + "\n")
+    stream.flush()
+
+
+def _receive(stream: TextIO) -> Optional[dict]:
+    line = stream.readline()
+    return json.loads(line) if line else None
+
+
+class Coordinator:
+    """Hands out shards to workers and merges their rows into results."""
+
+    def __init__(
+        self,
+        entrants: List[Entrant],
+        rounds: int = ROUNDS,
+        repetitions: int = 1,
+        seed: int = 0,
+        noise: Sequence[float] = (0.0,),
+        compile_bots: bool = True,
+        shard_size: int = SHARD_SIZE,
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        budget: Optional[Budget] = None,
+    ) -> None:
+        self.noise = tuple(noise)
+        self.config = {
+            "type": "config",
+            "entrants": [[e.name, e.digest] for e in entrants],
+            "rounds": rounds,
+            "repetitions": repetitions,
+            "seed": seed,
+            "noise": self.noise,
+            "compile_bots": compile_bots,
+            "budget": None if budget is None else budget.key(),
+        }
+        n = len(entrants)
+        self.names = names = [e.name for e in entrants]
+        self.results = [
+            TournamentResult(
+                names, rounds, [[None] * n for _ in range(n)], seed, repetitions, level
+            )
+            for level in self.noise
+        ]
+        self.shards = shards(n, repetitions, shard_size)
+        self._pending = list(range(len(self.shards)))
+        self._done = set()
+        # Workers connected now; their shards come back when they go.
+        self._connections = 0
+        self._lock = threading.Condition()
+
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                coordinator._serve(self.rfile, self.wfile)
+
+        self.server = socketserver.ThreadingTCPServer(address, Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return self.server.server_address[:2]
+
+    @property
+    def finished(self) -> bool:
+        return len(self._done) == len(self.shards)
+
+    def _next_shard(self) -> Optional[int]:
+        # Blocks while other workers still hold the only unfinished shards.
+        with self._lock:
+            while not self._pending and not self.finished:
+                self._lock.wait()
+            return self._pending.pop(0) if self._pending else None
+
+    def _serve(self, rfile, wfile) -> None:
+        reader = (line.decode() for line in rfile)
+        writer = _Writer(wfile)
+        holding: Optional[int] = None
+        with self._lock:
+            self._connections += 1
+        try:
+            _send(writer, self.config)
+            for line in reader:
+                message = json.loads(line)
+                if message["type"] == "error":
+                    print(f"worker failed: {message['message']}", file=sys.stderr)
+                    return
+                if message["type"] == "result":
+                    rows = self._parse(holding, message)
+                    if rows is None:
+                        print("worker sent rows for units it was not given", file=sys.stderr)
+                        return
+                    self._merge(holding, rows)
+                    holding = None
+                shard = self._next_shard()
+                if shard is None:
+                    _send(writer, {"type": "done"})
+                    return
+                holding = shard
+                _send(writer, {"type": "shard", "shard": shard, "units": self.shards[shard]})
+        finally:
+            with self._lock:
+                self._connections -= 1
+                if holding is not None:
+                    self._pending.append(holding)
+                self._lock.notify_all()
+
+    def _parse(self, holding: Optional[int], message: dict) -> Optional[list]:
+        # The rows of a result, if they cover exactly the shard handed out.
+        if holding is None or message.get("shard") != holding:
+            return None
+        rows = message.get("rows")
+        units = self.shards[holding]
+        if not isinstance(rows, list) or len(rows) != len(units):
+            return None
+        parsed = []
+        for unit, row in zip(units, rows):
+            if not isinstance(row, list) or len(row) != 4 or tuple(row[:3]) != unit:
+                return None
+            if not isinstance(row[3], list) or len(row[3]) != len(self.noise):
+                return None
+            try:
+                matches = [MatchResult(**match) for match in row[3]]
+            except TypeError:
+                return None
+            parsed.append((*unit, matches))
+        return parsed
+
+    def _merge(self, shard: int, rows: list) -> None:
+        with self._lock:
+            if shard in self._done:
+                return
+            for i, j, repetition, matches in rows:
+                record_matches(self.results, i, j, repetition, 1, matches)
+            self._done.add(shard)
+            self._lock.notify_all()
+
+    def run(self, workers: Sequence[subprocess.Popen] = ()) -> List[TournamentResult]:
+        """Serve workers until every shard is merged; one result per noise level.
+
+        ``workers`` are worker processes started for this coordinator. Once
+        every one has exited and its connection is closed with shards still
+        unplayed, raises RuntimeError instead of waiting for others.
+        """
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with self._lock:
+                while not self.finished:
+                    gone = all(process.poll() is not None for process in workers)
+                    if workers and gone and not self._connections:
+                        left = len(self.shards) - len(self._done)
+                        raise RuntimeError(f"every worker exited with {left} shards unplayed")
+                    self._lock.wait(WORKER_POLL if workers else None)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return self.results
+
+
+class _Writer:
+    # Text adaptor over a handler's binary wfile, for _send.
+    def __init__(self, wfile) -> None:
+        self.wfile = wfile
+
+    def write(self, text: str) -> None:
+        self.wfile.write(text.encode())
+
+    def flush(self) -> None:
+        self.wfile.flush()
+
+
+def _local_entrants(expected: List[List[str]], directory: Path) -> List[Entrant]:
+    found = {e.name: e for e in discover_strategies(directory)}
+    entrants = []
+    for name, digest in expected:
+        entrant = found.get(name)
+        if entrant is None:
+            raise ValueError(f"{name} is missing from {directory}")
+        if entrant.digest != digest:
+            raise ValueError(f"{name} in {directory} differs from the coordinator's copy")
+        entrants.append(entrant)
+    return entrants
+
+
+def _play_shard(
+    units: List[Unit],
+    config: dict,
+    machines: Dict[int, Optional[Machine]],
+    pool: SupervisedPool,
+) -> list:
+    rounds, seed, noise = config["rounds"], config["seed"], tuple(config["noise"])
+    budget = None if config["budget"] is None else Budget(*config["budget"])
+    names = [name for name, _ in config["entrants"]]
+    needed = sorted({k for i, j, _ in units for k in (i, j)} - machines.keys())
+    if config["compile_bots"]:
+        compiled = pool.map(compile_entrant, [(k, rounds, budget) for k in needed])
+    else:
+        compiled = [None] * len(needed)
+    machines.update(zip(needed, compiled))
+    # Compiled pairs without noise are deterministic: play each once per shard.
+    tasks: Dict[Unit, Pairing] = {}
+    played_by: List[Unit] = []
+    for i, j, repetition in units:
+        deterministic = machines[i] is not None and machines[j] is not None and not any(noise)
+        key = (i, j, -1) if deterministic else (i, j, repetition)
+        if key not in tasks:
+            tasks[key] = Pairing(
+                i,
+                j,
+                repetition,
+                1,
+                match_seed(seed, names[i], names[j], repetition),
+                rounds,
+                machines[i],
+                machines[j],
+                False,
+                0,
+                False,
+                noise,
+                budget,
+            )
+        played_by.append(key)
+    keys = {(task.i, task.j, task.repetition): key for key, task in tasks.items()}
+    outcomes: Dict[Unit, Outcome] = {}
+    for outcome in pool.imap_unordered(run_pairing, list(tasks.values()), settle_pairing):
+        task = outcome.task
+        outcomes[keys[task.i, task.j, task.repetition]] = outcome
+    return [
+        [i, j, repetition, [vars(m) for m in outcomes[key].matches]]
+        for (i, j, repetition), key in zip(units, played_by)
+    ]
+
+
+def work(
+    address: Tuple[str, int], directory: Path = SUBMISSIONS_DIR, processes: int = 1
+) -> None:
+    """Connect to a coordinator and play shards until it has none left.
+
+    Matches run on a SupervisedPool of ``processes`` workers, so a bot call
+    that will not stop costs its match, not the shard.
+    """
+    with socket.create_connection(address) as sock, sock.makefile("rw") as stream:
+        config = _receive(stream)
+        try:
+            entrants = _local_entrants(config["entrants"], directory)
+        except ValueError as exc:
+            _send(stream, {"type": "error", "message": str(exc)})
+            raise
+        with EntropyPool.create(config["seed"]) as entropy_pool, SupervisedPool(
+            processes, init_worker, (entrants, entropy_pool.name)
+        ) as pool:
+            machines: Dict[int, Optional[Machine]] = {}
+            _send(stream, {"type": "next"})
+            while True:
+                message = _receive(stream)
+                if message is None or message["type"] == "done":
+                    return
+                rows = _play_shard(message["units"], config, machines, pool)
+                _send(stream, {"type": "result", "shard": message["shard"], "rows": rows})
+
+
+def run_distributed(
+    entrants: List[Entrant],
+    workers: int = 2,
+    rounds: int = ROUNDS,
+    repetitions: int = 1,
+    seed: int = 0,
+    noise: Sequence[float] = (0.0,),
+    compile_bots: bool = True,
+    directory: Path = SUBMISSIONS_DIR,
+    shard_size: int = SHARD_SIZE,
+    budget: Optional[Budget] = None,
+) -> List[TournamentResult]:
+    """Coordinator plus ``workers`` local worker processes over localhost."""
+    coordinator = Coordinator(
+        entrants, rounds, repetitions, seed, noise, compile_bots, shard_size, budget=budget
+    )
+    host, port = coordinator.address
+    package_root = str(Path(__file__).resolve().parent.parent)
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [package_root, env.get("PYTHONPATH")]))
+    command = [
+        sys.executable,
+        "-m",
+        "tournament.distributed",
+        "worker",
+        "--connect",
+        f"{host}:{port}",
+        "--submissions",
+        str(directory),
+    ]
+    processes = [subprocess.Popen(command, env=env) for _ in range(workers)]
+    try:
+        return coordinator.run(processes)
+    except BaseException:
+        for process in processes:
+            process.kill()
+        raise
+    finally:
+        for process in processes:
+            process.wait()
+
+
+def _address(text: str) -> Tuple[str, int]:
+    host, _, port = text.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m tournament.distributed")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    coordinate = commands.add_parser("coordinate", help="hand out shards and print the leaderboard")
+    coordinate.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="address to listen on; 0.0.0.0 accepts workers from other hosts",
+    )
+    coordinate.add_argument("--port", type=int, default=7420)
+    coordinate.add_argument("--submissions", type=Path, default=SUBMISSIONS_DIR)
+    coordinate.add_argument("--rounds", type=int, default=ROUNDS)
+    coordinate.add_argument("--repetitions", type=int, default=1)
+    coordinate.add_argument("--seed", type=int, default=0)
+    coordinate.add_argument("--noise", type=float, nargs="+", default=[0.0], metavar="EPS")
+    coordinate.add_argument("--no-compile", dest="compile_bots", action="store_false")
+    coordinate.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    add_budget_arguments(coordinate)
+
+    worker = commands.add_parser("worker", help="play shards for a coordinator")
+    worker.add_argument("--connect", type=_address, required=True, metavar="HOST:PORT")
+    worker.add_argument("--submissions", type=Path, default=SUBMISSIONS_DIR)
+    worker.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.command == "worker":
+        work(args.connect, args.submissions, args.processes)
+        return
+
+    coordinator = Coordinator(
+        discover_strategies(args.submissions),
+        args.rounds,
+        args.repetitions,
+        args.seed,
+        args.noise,
+        args.compile_bots,
+        args.shard_size,
+        (args.host, args.port),
+        budget_from(args),
+    )
+    print(f"coordinating on {coordinator.address[0]}:{coordinator.address[1]}", file=sys.stderr)
+    results = coordinator.run()
+    print_sweep(dict(zip(coordinator.noise, results)))
+
+
+if __name__ == "__main__":
+    main()
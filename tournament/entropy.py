@@ -0,0 +1,184 @@
+"""Local, seed-derived stand-in for OS and network randomness.
+
+AkshitSivaraman_as658 fetches "quantum" random bytes from the ANU QRNG over
+HTTP with a 3 second timeout in every begin() and whenever its buffer runs
+dry, falling back to ``os.urandom``. In a tournament that is dead time per
+match, and either source makes the match impossible to replay.
+
+The runner prefetches a block of bytes derived from the tournament seed into
+shared memory once; workers attach to it by name. The loader points a
+submission's ``os`` and ``urllib`` references at stand-ins whose ``urandom``
+and ``urlopen`` serve bytes from that block, at a cursor owned by the bot's
+random stream, so every bot reads its own reproducible sequence and never
+blocks. Requests for the QRNG endpoint get a locally built JSON response in
+the endpoint's format; any other URL fails immediately.
+"""
+
+import json
+import os
+import types
+import urllib
+import urllib.error
+import urllib.parse
+import urllib.request
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional
+
+from . import rng
+
+POOL_SIZE = 1 << 20
+QRNG_HOST = "qrng.anu.edu.au"
+
+
+class EntropyPool:
+    """Seed-derived random bytes in a named shared memory block."""
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool) -> None:
+        self.memory = memory
+        self.owner = owner
+
+    @classmethod
+    def create(cls, seed: int, size: int = POOL_SIZE) -> "EntropyPool":
+        memory = shared_memory.SharedMemory(create=True, size=size)
+        memory.buf[:size] = rng.BotRandom(rng.derive_seed(seed, "entropy")).randbytes(size)
+        return cls(memory, owner=True)
+
+    @classmethod
+    def attach(cls, name: str) -> "EntropyPool":
+        # Pool workers share the creating process's resource tracker, so the
+        # block is unlinked exactly once, by the owner.
+        return cls(shared_memory.SharedMemory(name=name), owner=False)
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    @property
+    def size(self) -> int:
+        return self.memory.size
+
+    def read(self, offset: int, n: int) -> bytes:
+        """``n`` bytes starting at ``offset``, wrapping around the block."""
+        size = self.memory.size
+        start = offset % size
+        out = bytearray()
+        while len(out) < n:
+            take = min(n - len(out), size - start)
+            out += self.memory.buf[start : start + take]
+            start = 0
+        return bytes(out)
+
+    def close(self) -> None:
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+    def __enter__(self) -> "EntropyPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+_pool: Optional[EntropyPool] = None
+
+
+def install(pool: Optional[EntropyPool]) -> None:
+    """Serve bot entropy from ``pool`` (or from each bot's stream if None)."""
+    global _pool
+    _pool = pool
+
+
+def urandom(n: int) -> bytes:
+    """``os.urandom`` for bots: reads from the active bot's cursor."""
+    stream = rng.active()
+    if isinstance(stream, rng.NoRandom):
+        return stream.randbytes(n)
+    if not isinstance(stream, rng.BotRandom):
+        return os.urandom(n)
+    if _pool is None:
+        return stream.randbytes(n)
+    data = _pool.read(stream.entropy_cursor, n)
+    stream.entropy_cursor += n
+    return data
+
+
+class _Response:
+    def __init__(self, url: str, body: bytes) -> None:
+        self.url = url
+        self.status = 200
+        self._body = body
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        body, self._body = (self._body, b"") if amt is None else (self._body[:amt], self._body[amt:])
+        return body
+
+    def getcode(self) -> int:
+        return self.status
+
+    def geturl(self) -> str:
+        return self.url
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "_Response":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+def _qrng_response(url: str, query: Dict[str, list]) -> _Response:
+    length = min(max(int(query.get("length", ["1"])[0]), 1), 1024)
+    kind = query.get("type", ["uint8"])[0]
+    if kind == "uint16":
+        raw = urandom(2 * length)
+        data = [int.from_bytes(raw[k : k + 2], "big") for k in range(0, 2 * length, 2)]
+    else:
+        kind = "uint8"
+        data = list(urandom(length))
+    body = {"type": kind, "length": length, "data": data, "success": True}
+    return _Response(url, json.dumps(body).encode())
+
+
+def urlopen(url, data=None, timeout=None, *args: Any, **kwargs: Any) -> _Response:
+    """``urllib.request.urlopen`` for bots: answers the QRNG locally, refuses the rest."""
+    full_url = url.full_url if isinstance(url, urllib.request.Request) else str(url)
+    parts = urllib.parse.urlsplit(full_url)
+    if parts.hostname == QRNG_HOST:
+        return _qrng_response(full_url, urllib.parse.parse_qs(parts.query))
+    raise urllib.error.URLError("network access is disabled during matches")
+
+
+class _StandIn(types.ModuleType):
+    # Module whose own attributes override, and which otherwise delegates to
+    # the real module.
+    def __init__(self, real: types.ModuleType, **overrides: Any) -> None:
+        super().__init__(real.__name__, real.__doc__)
+        self.__dict__.update(overrides)
+        self._real = real
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._real, name)
+
+
+bot_os = _StandIn(os, urandom=urandom)
+bot_urllib_request = _StandIn(urllib.request, urlopen=urlopen)
+bot_urllib = _StandIn(urllib, request=bot_urllib_request)
+
+_REPLACEMENTS = {
+    id(os): bot_os,
+    id(os.urandom): urandom,
+    id(urllib): bot_urllib,
+    id(urllib.request): bot_urllib_request,
+    id(urllib.request.urlopen): urlopen,
+}
+
+
+def isolate_entropy(namespace: Dict[str, Any]) -> None:
+    """Point a module's ``os``/``urllib`` references at the local stand-ins."""
+    for key, value in list(namespace.items()):
+        replacement = _REPLACEMENTS.get(id(value))
+        if replacement is not None:
+            namespace[key] = replacement
@@ -0,0 +1,50 @@
+"""Play many matches at once in one process, on a pool of threads.
+
+With one match per worker process, a bot that blocks holds the whole process
+for as long as it waits, whether on a network call, a sleep or a slow file.
+The number of processes a tournament needs is then set by its I/O-bound bots,
+not by the CPUs. Here up to ``concurrency`` matches are in flight at once,
+each on a thread of a thread pool. A match blocked in I/O releases the GIL,
+so the others keep playing. Pure-Python matches still take turns on the GIL,
+so this only adds throughput where bots wait. The process pool still provides
+the CPU parallelism.
+
+Bots are ordinary blocking code, so the threads are the whole mechanism; no
+event loop would have anything to schedule between their calls.
+
+Bot random streams are activated per thread (see ``rng``), so a match draws
+the same numbers next to other matches as it does alone, and a tournament's
+scores do not depend on ``concurrency``.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def run_concurrently(fn: Callable[[T], R], items: Iterable[T], concurrency: int) -> Iterator[R]:
+    """``fn(item)`` for every item, at most ``concurrency`` at a time.
+
+    Each call runs on a pool thread. Results are yielded as the calls finish,
+    not in input order. An exception from ``fn`` propagates once the calls
+    already running have finished.
+    """
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="match") as threads:
+        pending = set()
+        for item in items:
+            if len(pending) == concurrency:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(threads.submit(fn, item))
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def map_concurrently(fn: Callable[[T], R], items: Iterable[T], concurrency: int) -> List[R]:
+    """``run_concurrently`` collected into a list; results in completion order."""
+    return list(run_concurrently(fn, items, concurrency))
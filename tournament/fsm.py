@@ -0,0 +1,340 @@
+"""Compile deterministic bots into finite-state machines by probing them.
+
+Many submissions are deterministic functions of the opponent's moves with a
+small amount of state: always-defect, fixed schedules, tit-for-tat variants.
+``compile_strategy`` learns an equivalent Moore machine from the bot's
+answers to probe histories (Angluin's L* with Rivest-Schapire counterexample
+processing), then verifies it against the real bot on full-length opponent
+sequences. The tournament plays compiled bots from the machine's lookup
+tables, so only the genuinely adaptive bots cost a Python ``turn()`` call per
+round.
+
+Verification is by testing, not proof: the machine is accepted once it agrees
+with the bot on every verification sequence.
+"""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Type, Union
+
+from ping_game_theory import History, Move, Strategy
+
+from .budget import Budget, Meter
+from .cycles import CycleDetector
+from .history import HistoryBuffer, PackedTrace
+from .match import MOVE_BITS, MOVES, PAYOFFS, ROUNDS, MatchResult
+from .rng import NoRandom, activate, active
+
+Word = Tuple[int, ...]
+
+_SCORES = tuple(
+    tuple(PAYOFFS[MOVES[i]][MOVES[j]] for j in range(2)) for i in range(2)
+)
+
+
+@dataclass(frozen=True)
+class Machine:
+    """A Moore machine over the opponent's moves, encoded as 0 (C) / 1 (D).
+
+    State 0 is the start state. ``outputs[s]`` is the move played in state
+    ``s`` and ``transitions[s][x]`` the next state after the opponent plays
+    ``x``.
+    """
+
+    outputs: Tuple[int, ...]
+    transitions: Tuple[Tuple[int, int], ...]
+
+    def run(self, opponent: Sequence[int]) -> List[int]:
+        """Moves played in rounds 1 .. len(opponent) + 1."""
+        state = 0
+        moves = [self.outputs[0]]
+        for x in opponent:
+            state = self.transitions[state][x]
+            moves.append(self.outputs[state])
+        return moves
+
+    def state_after(self, opponent: Sequence[int]) -> int:
+        state = 0
+        for x in opponent:
+            state = self.transitions[state][x]
+        return state
+
+
+class MachineBot(Strategy):
+    """Plays a compiled Machine when only one side of a match is compiled."""
+
+    machine: Machine
+
+    def __init__(self) -> None:
+        self.state = 0
+
+    def begin(self) -> Move:
+        self.state = 0
+        return MOVES[self.machine.outputs[0]]
+
+    def turn(self, history: History) -> Move:
+        self.state = self.machine.transitions[self.state][MOVE_BITS[history[-1].other]]
+        return MOVES[self.machine.outputs[self.state]]
+
+    def fingerprint(self) -> int:
+        return self.state
+
+    @classmethod
+    def for_machine(cls, name: str, machine: Machine) -> Type["MachineBot"]:
+        return type(name, (cls,), {"machine": machine})
+
+
+def play_machines(
+    a: Machine,
+    b: Machine,
+    rounds: int = ROUNDS,
+    trace: Optional[PackedTrace] = None,
+    extrapolate: bool = True,
+) -> MatchResult:
+    """Play two compiled machines against each other from their tables alone.
+
+    With ``extrapolate`` (and no ``trace``), the match stops as soon as the
+    pair of machine states repeats and the remaining rounds are scored in
+    closed form (see ``cycles``).
+    """
+    out_a, next_a = a.outputs, a.transitions
+    out_b, next_b = b.outputs, b.transitions
+    states_b = len(out_b)
+    detector = CycleDetector(rounds) if extrapolate and trace is None else None
+    state_a = state_b = 0
+    score_a = score_b = 0
+    for t in range(rounds):
+        if detector is not None:
+            tail = detector.check(state_a * states_b + state_b)
+            if tail is not None:
+                score_a += tail[0]
+                score_b += tail[1]
+                return MatchResult(score_a, score_b, rounds, extrapolated=rounds - t)
+        move_a = out_a[state_a]
+        move_b = out_b[state_b]
+        payoff_a, payoff_b = _SCORES[move_a][move_b]
+        score_a += payoff_a
+        score_b += payoff_b
+        if trace is not None:
+            trace.append(move_a, move_b)
+        elif detector is not None:
+            detector.record(2 * move_a + move_b, payoff_a, payoff_b)
+        state_a = next_a[state_a][move_b]
+        state_b = next_b[state_b][move_a]
+    return MatchResult(score_a, score_b, rounds)
+
+
+class _Incompilable(Exception):
+    pass
+
+
+class Responder(NamedTuple):
+    """Deterministic memory-one opponent used to verify a compiled machine.
+
+    ``table[2 * theirs + mine]`` is its next move, where ``theirs`` is its own
+    previous move and ``mine`` the probed bot's.
+    """
+
+    first: int
+    table: Tuple[int, int, int, int]
+
+
+# Every deterministic memory-one responder that opens with COOPERATE: covers
+# tit-for-tat, win-stay-lose-shift, always-C/D and their mirror images.
+RESPONDERS = [
+    Responder(0, (cc, cd, dc, dd))
+    for cc in (0, 1)
+    for cd in (0, 1)
+    for dc in (0, 1)
+    for dd in (0, 1)
+]
+
+
+Test = Union[List[int], Responder]
+
+
+class _Probe:
+    """Answers "which move does the bot play after this opponent history?"."""
+
+    def __init__(
+        self, cls: Type[Strategy], budget: int, limits: Optional[Budget] = None
+    ) -> None:
+        self.cls = cls
+        self.budget = budget
+        # Time limits per probe run, which counts as one match.
+        self.limits = limits
+        self.cache: Dict[Word, int] = {}
+
+    def run(
+        self, opponent: Union[Sequence[int], Responder], rounds: int, seed: int = 0
+    ) -> Tuple[List[int], List[int]]:
+        """Play a fresh bot for ``rounds`` rounds with the global RNG seeded.
+
+        ``opponent`` is a fixed list of moves or a Responder. Returns the
+        opponent moves the bot saw and the moves the bot played. The bot's
+        own random stream refuses every draw (see ``rng.NoRandom``), so a
+        bot that draws at all, even one that catches the error, cannot be
+        compiled.
+        """
+        self.budget -= rounds
+        if self.budget < 0:
+            raise _Incompilable("probe budget exhausted")
+        fixed = not isinstance(opponent, Responder)
+        seen: List[int] = []
+        saved = random.getstate()
+        random.seed(seed)
+        stream = NoRandom()
+        previous = active()
+        activate(stream)
+        meter = Meter(self.limits) if self.limits is not None else None
+        try:
+            cls = self.cls if meter is None else meter.wrap(0, self.cls)
+            bot = cls()
+            begin, turn = bot.begin, bot.turn
+            observe = getattr(bot, "observe", None)
+            if meter is not None:
+                begin, turn = meter.wrap(0, begin), meter.wrap(0, turn)
+                if observe is not None:
+                    observe = meter.wrap(0, observe)
+            history = HistoryBuffer()
+            move = begin()
+            played = [MOVE_BITS[move]]
+            for t in range(rounds - 1):
+                if fixed:
+                    theirs = opponent[t]
+                elif t == 0:
+                    theirs = opponent.first
+                else:
+                    theirs = opponent.table[2 * seen[-1] + played[-2]]
+                seen.append(theirs)
+                history.append(move, MOVES[theirs])
+                if observe is not None:
+                    observe(move, MOVES[theirs])
+                move = turn(history.view())
+                played.append(MOVE_BITS[move])
+        except Exception as exc:
+            raise _Incompilable(repr(exc)) from exc
+        finally:
+            activate(previous)
+            random.setstate(saved)
+            if meter is not None:
+                meter.close()
+        if stream.drawn:
+            raise _Incompilable("the bot drew randomness")
+        return seen, played
+
+    def query(self, word: Word) -> int:
+        move = self.cache.get(word)
+        if move is None:
+            move = self.cache[word] = self.run(word, len(word) + 1)[1][-1]
+        return move
+
+
+def _learn(probe: _Probe, tests: List[Test], rounds: int, max_states: int) -> Machine:
+    access: List[Word] = [()]
+    suffixes: List[Word] = [()]
+
+    def row(word: Word) -> Word:
+        return tuple(probe.query(word + e) for e in suffixes)
+
+    while True:
+        # Close the table: every one-move extension of a state must look like
+        # some known state, otherwise it is a new state.
+        index = {row(w): i for i, w in enumerate(access)}
+        transitions: List[Tuple[int, int]] = []
+        i = 0
+        while i < len(access):
+            step = []
+            for x in (0, 1):
+                r = row(access[i] + (x,))
+                if r not in index:
+                    if len(access) == max_states:
+                        raise _Incompilable(f"more than {max_states} states")
+                    index[r] = len(access)
+                    access.append(access[i] + (x,))
+                step.append(index[r])
+            transitions.append((step[0], step[1]))
+            i += 1
+        machine = Machine(tuple(probe.query(w) for w in access), tuple(transitions))
+
+        counterexample = _find_counterexample(probe, machine, tests, rounds)
+        if counterexample is None:
+            return machine
+        suffix = _distinguishing_suffix(probe, machine, access, counterexample)
+        if suffix in suffixes:
+            raise _Incompilable("bot is not deterministic")
+        suffixes.append(suffix)
+
+
+def _find_counterexample(
+    probe: _Probe, machine: Machine, tests: List[Test], rounds: int
+) -> Optional[Word]:
+    for opponent in tests:
+        seen, actual = probe.run(opponent, rounds)
+        predicted = machine.run(seen)
+        for i, (a, p) in enumerate(zip(actual, predicted)):
+            if a != p:
+                word = tuple(seen[:i])
+                probe.cache[word] = a
+                return word
+    return None
+
+
+def _distinguishing_suffix(
+    probe: _Probe, machine: Machine, access: List[Word], word: Word
+) -> Word:
+    # Rivest-Schapire: with alpha(i) = bot's answer to access(word[:i]) +
+    # word[i:], alpha(0) is the bot's move and alpha(len) the machine's. Binary
+    # search for adjacent i, i + 1 that disagree; word[i + 1:] then separates
+    # two histories the machine merged.
+    def alpha(i: int) -> int:
+        return probe.query(access[machine.state_after(word[:i])] + word[i:])
+
+    lo, hi = 0, len(word)
+    a_lo = alpha(lo)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if alpha(mid) == a_lo:
+            lo = mid
+        else:
+            hi = mid
+    return word[hi:]
+
+
+def compile_strategy(
+    cls: Type[Strategy],
+    rounds: int = ROUNDS,
+    max_states: int = 64,
+    tests: int = 8,
+    budget: int = 1_000_000,
+    seed: int = 0,
+    limits: Optional[Budget] = None,
+) -> Optional[Machine]:
+    """Learn a Machine that plays exactly like ``cls`` for ``rounds`` rounds.
+
+    The machine is verified against every Responder and against ``tests``
+    random opponents whose defect rates are spread over (0, 1).
+
+    Returns None if the bot draws randomness in any probe or verification
+    run, raises, needs more than ``max_states`` states, or would take more
+    than ``budget`` probe turns.
+    With ``limits``, it also returns None if the bot goes over those time
+    limits in any probe run (see ``budget``).
+    """
+    rng = random.Random(seed)
+    verification: List[Test] = list(RESPONDERS)
+    for k in range(1, tests + 1):
+        rate = k / (tests + 1)
+        verification.append([int(rng.random() < rate) for _ in range(rounds - 1)])
+
+    probe = _Probe(cls, budget, limits)
+    try:
+        # Draws through ``random``, ``bot_random`` or ``os.urandom`` fail in
+        # every probe. A bot that reaches the process-wide generator some
+        # other way must still play the same under two global seeds.
+        short = min(rounds, 500)
+        if probe.run(verification[-1], short, 1) != probe.run(verification[-1], short, 2):
+            return None
+        return _learn(probe, verification, rounds, max_states)
+    except _Incompilable:
+        return None
@@ -0,0 +1,354 @@
+"""Append-only match history handed to ``Strategy.turn()``.
+
+StrategyTester passes ``tuple(history)`` every turn, which copies the whole
+match so far and makes a 10,000 round match quadratic before the bot has even
+looked at it. Here the engine appends each round to a HistoryBuffer once and
+gives the bot a HistoryView: an O(1), zero-copy window over the rounds played
+so far. Because the buffer is append-only, a view never changes after the bot
+receives it, so it behaves like the tuple it replaces.
+
+A buffer stores one byte per round, the code ``2 * a + b`` of the two sides'
+moves encoded as 0 (C) / 1 (D). Both bots read the same buffer: side 1's view
+decodes each code with ``self`` and ``other`` swapped, so a match appends each
+round once. A round only has four possible values, so entries are shared:
+reading a round returns one of four immutable RoundEntry objects, and
+appending a round allocates nothing.
+"""
+
+from itertools import islice
+from typing import Callable, Iterator, List, Sequence, Tuple, TypeVar, Union, overload
+
+from ping_game_theory import HistoryEntry, Move
+
+from .periods import PeriodDetector
+from .stats import OpponentStats
+
+T = TypeVar("T")
+
+_C, _D = Move.COOPERATE, Move.DEFECT
+# _CODE[move_a][move_b] is the round's code.
+_CODE = {_C: {_C: 0, _D: 1}, _D: {_C: 2, _D: 3}}
+
+
+class SequenceView(Sequence[T]):
+    """Read-only window ``items[start:stop]`` that never copies ``items``.
+
+    Slicing with step 1 returns another view in O(1), so tail windows such as
+    ``moves[-100:]`` are free. Other steps return a list.
+    """
+
+    __slots__ = ("_items", "_start", "_stop")
+
+    def __init__(self, items: List[T], start: int, stop: int) -> None:
+        self._items = items
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> Union["SequenceView[T]", List[T]]: ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._stop - self._start)
+            if step != 1:
+                return [self._items[self._start + i] for i in range(start, stop, step)]
+            return self._window(self._start + start, self._start + max(start, stop))
+        size = self._stop - self._start
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self._items[self._start + index]
+
+    def _window(self, start: int, stop: int) -> "SequenceView[T]":
+        return SequenceView(self._items, start, stop)
+
+    def __iter__(self) -> Iterator[T]:
+        if self._start == 0:
+            return islice(self._items, self._stop)
+        return iter(self._items[self._start : self._stop])
+
+    def __reversed__(self) -> Iterator[T]:
+        items = self._items
+        for i in range(self._stop - 1, self._start - 1, -1):
+            yield items[i]
+
+    def count(self, value) -> int:
+        return self._items[self._start : self._stop].count(value)
+
+    def tail(self, n: int) -> "SequenceView[T]":
+        """The last ``n`` items (fewer if the view is shorter), in O(1)."""
+        return self._window(max(self._start, self._stop - n), self._stop)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (SequenceView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({list(self)!r})"
+
+
+class RoundEntry(HistoryEntry):
+    """One round of a History, shared by every round with the same moves.
+
+    Reads as ``.self`` / ``.other`` like HistoryEntry, and as the pair
+    ``(self, other)`` through ``[0]`` / ``[1]``, ``len()`` and unpacking, so
+    bots written against tuples work too. Entries are immutable.
+    """
+
+    __slots__ = ("code", "_pair")
+
+    def __init__(self, code: int) -> None:
+        pair = (_D if code & 2 else _C, _D if code & 1 else _C)
+        set_attribute = object.__setattr__
+        set_attribute(self, "self", pair[0])
+        set_attribute(self, "other", pair[1])
+        set_attribute(self, "code", code)
+        set_attribute(self, "_pair", pair)
+
+    def __setattr__(self, name: str, value) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, index):
+        return self._pair[index]
+
+    def __iter__(self) -> Iterator[Move]:
+        return iter(self._pair)
+
+    def __len__(self) -> int:
+        return 2
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HistoryEntry):
+            return self.self == other.self and self.other == other.other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._pair)
+
+    def __reduce__(self) -> Tuple[Callable[[int], "RoundEntry"], Tuple[int]]:
+        return _entry, (self.code,)
+
+    def __repr__(self) -> str:
+        return f"RoundEntry(self={self.self!r}, other={self.other!r})"
+
+
+# The four rounds, indexed by code; and each side's move, indexed by code.
+ENTRIES = tuple(RoundEntry(code) for code in range(4))
+_SIDE_A = (_C, _C, _D, _D)
+_SIDE_B = (_C, _D, _C, _D)
+# Per side: the entries, and the (self, other) columns, indexed by code.
+_ENTRIES = (ENTRIES, (ENTRIES[0], ENTRIES[2], ENTRIES[1], ENTRIES[3]))
+_COLUMNS = ((_SIDE_A, _SIDE_B), (_SIDE_B, _SIDE_A))
+# Side 1's code for each of side 0's, as a bytes.translate() table.
+_MIRROR = bytes([0, 2, 1, 3]) + bytes(range(4, 256))
+# Per side: (own move bit, opponent's move bit), indexed by code.
+_BITS = (((0, 0), (0, 1), (1, 0), (1, 1)), ((0, 0), (1, 0), (0, 1), (1, 1)))
+
+
+def _entry(code: int) -> RoundEntry:
+    # Unpickling and copying give back the shared entry.
+    return ENTRIES[code]
+
+
+class CodedView(SequenceView[T]):
+    """Read-only window over round codes, decoded through ``table``."""
+
+    __slots__ = ("_table",)
+
+    def __init__(self, codes: bytearray, table: Tuple[T, ...], start: int, stop: int) -> None:
+        super().__init__(codes, start, stop)
+        self._table = table
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._stop - self._start)
+            if step != 1:
+                table, codes = self._table, self._items
+                return [table[codes[self._start + i]] for i in range(start, stop, step)]
+            return self._window(self._start + start, self._start + max(start, stop))
+        size = self._stop - self._start
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self._table[self._items[self._start + index]]
+
+    def _window(self, start: int, stop: int) -> "CodedView[T]":
+        return CodedView(self._items, self._table, start, stop)
+
+    def __iter__(self) -> Iterator[T]:
+        if self._start:
+            codes = self._items[self._start : self._stop]
+        else:
+            codes = islice(self._items, self._stop)
+        return map(self._table.__getitem__, codes)
+
+    def __reversed__(self) -> Iterator[T]:
+        table, codes = self._table, self._items
+        for i in range(self._stop - 1, self._start - 1, -1):
+            yield table[codes[i]]
+
+    def count(self, value) -> int:
+        codes = self._items[self._start : self._stop]
+        return sum(codes.count(code) for code, item in enumerate(self._table) if item == value)
+
+
+class HistoryView(CodedView[HistoryEntry]):
+    """The History given to ``turn()``, with per-column move views.
+
+    ``self_moves`` and ``other_moves`` are the columns ``[h.self for h in
+    history]`` and ``[h.other for h in history]``, decoded from the same
+    codes instead of being rebuilt by the bot every turn. ``side`` is the
+    player whose moves are ``self``.
+    """
+
+    __slots__ = ("_buffer", "_side")
+
+    def __init__(self, buffer: "HistoryBuffer", start: int, stop: int, side: int = 0) -> None:
+        # One view is made every turn, so skip the chain of __init__ calls.
+        self._items = buffer.codes
+        self._table = _ENTRIES[side]
+        self._start = start
+        self._stop = stop
+        self._buffer = buffer
+        self._side = side
+
+    def _window(self, start: int, stop: int) -> "HistoryView":
+        return HistoryView(self._buffer, start, stop, self._side)
+
+    @property
+    def self_moves(self) -> SequenceView[Move]:
+        return CodedView(self._items, _COLUMNS[self._side][0], self._start, self._stop)
+
+    @property
+    def other_moves(self) -> SequenceView[Move]:
+        return CodedView(self._items, _COLUMNS[self._side][1], self._start, self._stop)
+
+    def tail_codes(self, n: int) -> bytes:
+        """The last ``n`` rounds (fewer if the view is shorter) as codes ``2 * self + other``."""
+        codes = bytes(self._items[max(self._start, self._stop - n) : self._stop])
+        return codes.translate(_MIRROR) if self._side else codes
+
+    @property
+    def stats(self) -> OpponentStats:
+        """Running statistics of the match up to the end of this view (see ``stats``).
+
+        The object is shared and moves on with the match, so read it during
+        the turn the view was handed over in.
+        """
+        return self._buffer.stats(self._side, self._stop)
+
+    @property
+    def periods(self) -> PeriodDetector:
+        """Period detector over the opponent's moves up to the end of this view.
+
+        Shared and kept up to date like ``stats`` (see ``periods``).
+        """
+        return self._buffer.periods(self._side, self._stop)
+
+
+class LiveHistory(HistoryView):
+    """A HistoryView that always covers every round appended so far.
+
+    Bots that define ``observe()`` (see ``match``) get one of these, made once
+    per match, as the history argument of every ``turn()`` instead of a fresh
+    snapshot each turn. It grows as the match goes on, so a bot that keeps it
+    past the current turn should keep a slice of it instead: slices are
+    ordinary snapshots.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, buffer: "HistoryBuffer", side: int = 0) -> None:
+        self._items = buffer.codes
+        self._table = _ENTRIES[side]
+        self._start = 0
+        self._buffer = buffer
+        self._side = side
+
+    @property
+    def _stop(self) -> int:
+        return len(self._items)
+
+
+class HistoryBuffer:
+    """Engine-owned, append-only record of both sides' moves in a match."""
+
+    __slots__ = ("codes", "_stats", "_periods")
+
+    def __init__(self) -> None:
+        self.codes = bytearray()
+        self._stats = [None, None]
+        self._periods = [None, None]
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def append(self, move_a: Move, move_b: Move) -> None:
+        self.codes.append(_CODE[move_a][move_b])
+
+    def view(self, side: int = 0) -> HistoryView:
+        """Snapshot of every round appended so far, as ``side`` sees it."""
+        return HistoryView(self, 0, len(self.codes), side)
+
+    def live(self, side: int = 0) -> LiveHistory:
+        """A view that keeps up with every round appended, as ``side`` sees it."""
+        return LiveHistory(self, side)
+
+    def stats(self, side: int, stop: int) -> OpponentStats:
+        """``side``'s OpponentStats, brought up to round ``stop``."""
+        stats = self._stats[side]
+        if stats is None:
+            stats = self._stats[side] = OpponentStats()
+        if stats.rounds < stop:
+            bits, update = _BITS[side], stats.update
+            for code in self.codes[stats.rounds : stop]:
+                update(*bits[code])
+        return stats
+
+    def periods(self, side: int, stop: int) -> PeriodDetector:
+        """PeriodDetector over ``side``'s opponent, brought up to round ``stop``."""
+        periods = self._periods[side]
+        if periods is None:
+            periods = self._periods[side] = PeriodDetector()
+        if periods.rounds < stop:
+            bits, update = _BITS[side], periods.update
+            for code in self.codes[periods.rounds : stop]:
+                update(bits[code][1])
+        return periods
+
+
+class PackedTrace:
+    """Both sides' moves of one match, packed 2 bits per round.
+
+    Round ``t`` lives in byte ``t // 4`` at bit ``2 * (t % 4)`` as the code
+    ``2 * a + b``, where ``a`` and ``b`` are the two sides' moves encoded as
+    0 (C) / 1 (D). Unused bits of the last byte are zero.
+    """
+
+    __slots__ = ("data", "rounds")
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.rounds = 0
+
+    def __len__(self) -> int:
+        return self.rounds
+
+    def append(self, move_a: int, move_b: int) -> None:
+        shift = (self.rounds & 3) << 1
+        if not shift:
+            self.data.append(0)
+        self.data[-1] |= (move_a << 1 | move_b) << shift
+        self.rounds += 1
@@ -0,0 +1,198 @@
+"""Per-turn latency instrumentation for the match loop.
+
+A TurnProfile wraps a bot's ``turn()`` and records how long each call took,
+counting the ``observe()`` call before it for bots that define one, both into
+a log2-bucketed histogram and into per-block totals over the round index.
+Fitting mean latency against round index on a log-log scale gives the exponent
+``k`` in ``latency ~ round ** k``: bots that rescan the whole history every
+turn come out near 1 and are flagged as growing. Optionally every
+``profile_every``-th turn runs under cProfile to show where the time goes.
+"""
+
+import cProfile
+import functools
+import math
+import pstats
+from time import perf_counter_ns
+from typing import Callable, Dict, List, Optional
+
+from ping_game_theory import History, Move
+
+BUCKETS = 40
+BLOCK = 100
+GROWTH_THRESHOLD = 0.75
+
+
+class _RawStats:
+    # pstats.Stats loads anything with create_stats() and a .stats dict.
+    def __init__(self, stats: dict) -> None:
+        self.stats = stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+class TurnProfile:
+    """Latency record for one bot, over one or more matches."""
+
+    def __init__(self, profile_every: int = 0) -> None:
+        self.profile_every = profile_every
+        # histogram[b] counts turns that took [2**b, 2**(b+1)) nanoseconds.
+        self.histogram = [0] * BUCKETS
+        # block_ns[k] / block_turns[k] is the mean latency over rounds
+        # [k * BLOCK, (k + 1) * BLOCK).
+        self.block_ns: List[int] = []
+        self.block_turns: List[int] = []
+        self.profile_stats: Optional[dict] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        # Time spent in observe() since the last turn().
+        self._observed_ns = 0
+
+    @property
+    def turns(self) -> int:
+        return sum(self.histogram)
+
+    @property
+    def total_ns(self) -> int:
+        return sum(self.block_ns)
+
+    def record(self, round_index: int, ns: int) -> None:
+        self.histogram[min(max(ns, 1).bit_length() - 1, BUCKETS - 1)] += 1
+        block = round_index // BLOCK
+        if block >= len(self.block_ns):
+            grow = block + 1 - len(self.block_ns)
+            self.block_ns.extend([0] * grow)
+            self.block_turns.extend([0] * grow)
+        self.block_ns[block] += ns
+        self.block_turns[block] += 1
+
+    def wrap(self, turn: Callable[[History], Move]) -> Callable[[History], Move]:
+        """Return ``turn`` instrumented to record into this profile."""
+
+        @functools.wraps(turn)
+        def timed(history: History) -> Move:
+            round_index = len(history)
+            if self.profile_every and round_index % self.profile_every == 0:
+                if self._profiler is None:
+                    self._profiler = cProfile.Profile()
+                start = perf_counter_ns()
+                self._profiler.enable()
+                try:
+                    return turn(history)
+                finally:
+                    self._profiler.disable()
+                    ns, self._observed_ns = perf_counter_ns() - start + self._observed_ns, 0
+                    self.record(round_index, ns)
+            start = perf_counter_ns()
+            try:
+                return turn(history)
+            finally:
+                ns, self._observed_ns = perf_counter_ns() - start + self._observed_ns, 0
+                self.record(round_index, ns)
+
+        return timed
+
+    def wrap_observe(self, observe: Callable[[Move, Move], None]) -> Callable[[Move, Move], None]:
+        """Return ``observe`` timed into the record of the turn() after it."""
+
+        @functools.wraps(observe)
+        def timed(mine: Move, theirs: Move) -> None:
+            start = perf_counter_ns()
+            try:
+                observe(mine, theirs)
+            finally:
+                self._observed_ns += perf_counter_ns() - start
+
+        return timed
+
+    def finish(self) -> None:
+        """Fold the sampled cProfile data into ``profile_stats``.
+
+        Call once the match is over; the profile can then be pickled.
+        """
+        if self._profiler is None:
+            return
+        self._profiler.create_stats()
+        self._merge_stats(self._profiler.stats)
+        self._profiler = None
+
+    def _merge_stats(self, stats: dict) -> None:
+        if self.profile_stats is None:
+            self.profile_stats = dict(stats)
+        else:
+            merged = pstats.Stats(_RawStats(self.profile_stats))
+            merged.add(_RawStats(stats))
+            self.profile_stats = merged.stats
+
+    def merge(self, other: "TurnProfile") -> None:
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        if len(other.block_ns) > len(self.block_ns):
+            grow = len(other.block_ns) - len(self.block_ns)
+            self.block_ns.extend([0] * grow)
+            self.block_turns.extend([0] * grow)
+        for k, (ns, turns) in enumerate(zip(other.block_ns, other.block_turns)):
+            self.block_ns[k] += ns
+            self.block_turns[k] += turns
+        if other.profile_stats is not None:
+            self._merge_stats(other.profile_stats)
+
+    def percentile(self, q: float) -> int:
+        """Upper bound, in nanoseconds, of the ``q`` quantile bucket."""
+        target = q * self.turns
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if count and seen >= target:
+                return 2 ** (bucket + 1)
+        return 0
+
+    def growth_exponent(self) -> Optional[float]:
+        """Least-squares slope of log(mean latency) against log(round).
+
+        The first block is skipped as warm-up. Returns None with fewer than
+        three usable blocks.
+        """
+        points = [
+            (math.log((k + 0.5) * BLOCK), math.log(ns / turns))
+            for k, (ns, turns) in enumerate(zip(self.block_ns, self.block_turns))
+            if k > 0 and turns and ns
+        ]
+        if len(points) < 3:
+            return None
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        return sxy / sxx
+
+    def grows(self, threshold: float = GROWTH_THRESHOLD) -> bool:
+        exponent = self.growth_exponent()
+        return exponent is not None and exponent > threshold
+
+    def stats(self) -> Optional[pstats.Stats]:
+        if self.profile_stats is None:
+            return None
+        return pstats.Stats(_RawStats(self.profile_stats))
+
+
+def format_report(profiles: Dict[str, TurnProfile]) -> str:
+    """One line per bot, slowest total first."""
+    width = max((len(name) for name in profiles), default=0)
+    lines = [
+        f"{'bot':<{width}}  {'turns':>8}  {'mean us':>9}  {'p50 us':>8}  "
+        f"{'p99 us':>8}  {'growth':>6}"
+    ]
+    ranked = sorted(profiles.items(), key=lambda item: -item[1].total_ns)
+    for name, profile in ranked:
+        if not profile.turns:
+            continue
+        exponent = profile.growth_exponent()
+        growth = "-" if exponent is None else f"{exponent:.2f}"
+        flag = "  GROWS" if profile.grows() else ""
+        lines.append(
+            f"{name:<{width}}  {profile.turns:>8}  "
+            f"{profile.total_ns / profile.turns / 1000:>9.1f}  "
+            f"{profile.percentile(0.5) / 1000:>8.1f}  "
+            f"{profile.percentile(0.99) / 1000:>8.1f}  {growth:>6}{flag}"
+        )
+    return "\n".join(lines)
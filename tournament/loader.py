@@ -0,0 +1,160 @@
+"""Import submissions without running their module-level ``StrategyTester``.
+
+Almost every submission ends with ``StrategyTester(Bot).run()``, which plays a
+full 10,000 round test session on import. The loader executes the submission
+with an inert ``StrategyTester`` in place of the real one, so importing a bot
+only defines its classes. Its references to ``random`` are then pointed at the
+engine's per-bot streams (see ``rng``), and those to ``os`` and ``urllib`` at
+the local entropy service (see ``entropy``). Compiled code is cached on disk
+and loaded classes are cached in-process, both keyed by the file's path and
+the SHA-256 of its contents, so two files with the same contents still get
+their own module and their own filename in tracebacks.
+"""
+
+import hashlib
+import inspect
+import marshal
+import sys
+import threading
+import types
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Type
+
+import ping_game_theory
+from ping_game_theory import Strategy
+
+from .entropy import isolate_entropy
+from .rng import isolate_random
+
+SUBMISSIONS_DIR = Path(__file__).resolve().parent.parent / "submissions"
+CACHE_DIR = Path(__file__).resolve().parent.parent / ".tournament-cache"
+
+
+class _InertTester(ping_game_theory.StrategyTester):
+    def run(self) -> None:
+        pass
+
+
+_quiet_ping = types.ModuleType(ping_game_theory.__name__, ping_game_theory.__doc__)
+_quiet_ping.__dict__.update(vars(ping_game_theory))
+_quiet_ping.StrategyTester = _InertTester
+_swap_lock = threading.Lock()
+
+
+@dataclass
+class Submission:
+    path: str
+    digest: str
+    classes: Dict[str, Type[Strategy]]
+
+
+# Keyed by (path, digest).
+_loaded: Dict[Tuple[str, str], Submission] = {}
+
+
+def _compile(source: bytes, path: str, digest: str) -> types.CodeType:
+    # The path is baked into the code object as its filename.
+    where = hashlib.sha256(path.encode()).hexdigest()[:16]
+    cached = CACHE_DIR / "code" / f"{digest}-{where}-{sys.implementation.cache_tag}"
+    try:
+        return marshal.loads(cached.read_bytes())
+    except (OSError, ValueError, EOFError):
+        pass
+    code = compile(source, path, "exec")
+    try:
+        cached.parent.mkdir(parents=True, exist_ok=True)
+        cached.write_bytes(marshal.dumps(code))
+    except OSError:
+        pass
+    return code
+
+
+def _strategy_classes(module: types.ModuleType) -> Dict[str, Type[Strategy]]:
+    return {
+        name: obj
+        for name, obj in vars(module).items()
+        if inspect.isclass(obj)
+        and issubclass(obj, Strategy)
+        and obj.__module__ == module.__name__
+        and not inspect.isabstract(obj)
+    }
+
+
+def load_submission(path: str, digest: Optional[str] = None) -> Submission:
+    """Execute ``path`` with an inert StrategyTester and return its bots.
+
+    Loading the same file with the same contents twice returns the cached
+    Submission. With ``digest``, a cached Submission for it is returned
+    without reading the file again.
+    """
+    path = str(path)
+    if digest is not None:
+        submission = _loaded.get((path, digest))
+        if submission is not None:
+            return submission
+    source = Path(path).read_bytes()
+    digest = hashlib.sha256(source).hexdigest()
+    submission = _loaded.get((path, digest))
+    if submission is not None:
+        return submission
+
+    module_name = f"submissions.{Path(path).stem}"
+    module = types.ModuleType(module_name)
+    module.__file__ = path
+    code = _compile(source, path, digest)
+    with _swap_lock:
+        real = sys.modules.get("ping_game_theory")
+        sys.modules["ping_game_theory"] = _quiet_ping
+        try:
+            exec(code, module.__dict__)
+        finally:
+            sys.modules["ping_game_theory"] = real
+    isolate_random(module.__dict__)
+    isolate_entropy(module.__dict__)
+    # Registered so that bot classes and instances can be pickled by name.
+    sys.modules[module_name] = module
+
+    submission = Submission(path, digest, _strategy_classes(module))
+    _loaded[(path, digest)] = submission
+    return submission
+
+
+@dataclass(frozen=True)
+class Entrant:
+    """One Strategy subclass found in a submission file."""
+
+    path: str
+    class_name: str
+    # SHA-256 of the submission file's contents, read once when the entrant
+    # is made.
+    digest: str = field(default="", compare=False)
+
+    def __post_init__(self) -> None:
+        if not self.digest:
+            object.__setattr__(self, "digest", load_submission(self.path).digest)
+
+    @property
+    def name(self) -> str:
+        return f"{Path(self.path).stem}.{self.class_name}"
+
+    def load(self) -> Type[Strategy]:
+        return load_submission(self.path, self.digest).classes[self.class_name]
+
+
+def discover_strategies(directory: Path = SUBMISSIONS_DIR) -> List[Entrant]:
+    """Return every Strategy subclass defined in ``directory``, in file order.
+
+    Files that fail to load are reported on stderr and skipped.
+    """
+    entrants = []
+    for path in sorted(Path(directory).glob("*.py")):
+        try:
+            submission = load_submission(str(path))
+        except Exception as exc:
+            print(f"skipping {path.name}: {exc!r}", file=sys.stderr)
+            continue
+        entrants.extend(
+            Entrant(str(path), name, submission.digest) for name in submission.classes
+        )
+    return entrants
@@ -0,0 +1,256 @@
+import random
+from dataclasses import dataclass
+from typing import Hashable, Optional, Type
+
+from ping_game_theory import Move, Strategy, StrategyTester
+
+from .budget import Budget, BudgetExceeded, Meter
+from .cycles import SPOT_CHECK_CYCLES, CycleDetector
+from .history import HistoryBuffer, PackedTrace
+from .instrument import TurnProfile
+from .memory import MemoryMeter, MemoryProfile
+from .rng import BotRandom, activate, derive_seed, fresh_seed
+
+# Bump whenever a change to the engine can change any match's scores; cached
+# results (see ``cache``) from other versions are then ignored.
+ENGINE_VERSION = 4
+
+ROUNDS = StrategyTester.ROUNDS
+PAYOFFS = StrategyTester.PAYOFFS
+
+# Compact move encoding used wherever moves are stored as ints.
+MOVES = (Move.COOPERATE, Move.DEFECT)
+MOVE_BITS = {Move.COOPERATE: 0, Move.DEFECT: 1}
+_FLIP = {Move.COOPERATE: Move.DEFECT, Move.DEFECT: Move.COOPERATE}
+
+
+class StrategyError(Exception):
+    """A bot raised, or returned something that is not a Move."""
+
+    def __init__(self, side: int, message: str) -> None:
+        super().__init__(message)
+        self.side = side
+
+
+@dataclass
+class MatchResult:
+    score_a: int
+    score_b: int
+    rounds: int
+    # Seed that replays this match exactly; None for matches with no randomness.
+    seed: Optional[int] = None
+    # Trailing rounds scored in closed form after a cycle was found.
+    extrapolated: int = 0
+    # Side (0 or 1) that forfeited the match, and why; see ``forfeit``.
+    forfeit: Optional[int] = None
+    reason: Optional[str] = None
+
+
+def forfeit(side: int, rounds: int, seed: Optional[int], reason: str) -> MatchResult:
+    """Result of a match ``side`` forfeited by raising or by going over budget.
+
+    The forfeiting bot scores nothing. Its opponent scores the mutual
+    cooperation payoff for every round, however far the match got.
+    """
+    scores = [PAYOFFS[Move.COOPERATE][Move.COOPERATE][0] * rounds] * 2
+    scores[side] = 0
+    return MatchResult(scores[0], scores[1], rounds, seed, forfeit=side, reason=reason)
+
+
+def _construct(side: int, stream: BotRandom, cls: Type[Strategy]) -> Strategy:
+    activate(stream)
+    try:
+        return cls()
+    except BudgetExceeded as exc:
+        raise StrategyError(side, f"{cls.__name__}() {exc}") from exc
+    except Exception as exc:
+        raise StrategyError(side, f"{cls.__name__}() raised {exc!r}") from exc
+
+
+def _fingerprint(side: int, stream: BotRandom, fn) -> Hashable:
+    activate(stream)
+    try:
+        return fn()
+    except Exception as exc:
+        raise StrategyError(side, f"{fn.__qualname__}() raised {exc!r}") from exc
+
+
+def _call(side: int, stream: BotRandom, fn, *args) -> Move:
+    activate(stream)
+    try:
+        move = fn(*args)
+    except BudgetExceeded as exc:
+        raise StrategyError(side, f"{fn.__qualname__}() {exc}") from exc
+    except Exception as exc:
+        raise StrategyError(side, f"{fn.__qualname__}() raised {exc!r}") from exc
+    if not isinstance(move, Move):
+        raise StrategyError(side, f"{fn.__qualname__}() returned {type(move).__name__}")
+    return move
+
+
+def _observe(side: int, stream: BotRandom, fn, mine: Move, theirs: Move) -> None:
+    activate(stream)
+    try:
+        fn(mine, theirs)
+    except BudgetExceeded as exc:
+        raise StrategyError(side, f"{fn.__qualname__}() {exc}") from exc
+    except Exception as exc:
+        raise StrategyError(side, f"{fn.__qualname__}() raised {exc!r}") from exc
+
+
+def play_match(
+    cls_a: Type[Strategy],
+    cls_b: Type[Strategy],
+    rounds: int = ROUNDS,
+    profile_a: Optional[TurnProfile] = None,
+    profile_b: Optional[TurnProfile] = None,
+    seed: Optional[int] = None,
+    trace: Optional[PackedTrace] = None,
+    extrapolate: bool = True,
+    noise: float = 0.0,
+    budget: Optional[Budget] = None,
+    memory_a: Optional[MemoryProfile] = None,
+    memory_b: Optional[MemoryProfile] = None,
+) -> MatchResult:
+    """Play one match the same way StrategyTester does and return both scores.
+
+    Each bot draws from its own random stream derived from ``seed`` (see
+    ``rng``), so the same seed always replays the same match. Without a seed
+    a fresh one is drawn and returned in the result.
+    ``profile_a`` / ``profile_b`` record the latency of each side's turn(),
+    and ``trace`` records every round's moves.
+
+    If both bots define ``fingerprint()`` and ``extrapolate`` is set, the
+    match stops once the joint state repeats and has passed its spot checks,
+    and the remaining rounds are scored in closed form (see ``cycles``). This
+    is skipped while profiling or tracing, which need every round.
+
+    With ``noise``, each move is flipped with that probability after the bot
+    chose it (a trembling hand); both bots see the flipped moves. The flips
+    come from their own stream derived from ``seed``, drawn for both sides
+    every round whatever the level, so a move flipped at one noise level is
+    flipped at every higher level of the same seed.
+
+    A bot that defines ``observe(mine, theirs)`` is called with each round's
+    moves (after any noise) as soon as the round is played. Its ``turn()``
+    then gets a LiveHistory, made once for the match, instead of a new
+    snapshot every turn, so a bot that keeps its own state from ``observe()``
+    costs the engine nothing to hand the history to.
+
+    With ``budget``, every call into either bot is metered against it (see
+    ``budget``); a bot over budget raises StrategyError like a bot that
+    crashed. ``memory_a`` / ``memory_b`` record the memory each side holds,
+    and ``budget.memory`` caps it (see ``memory``).
+    """
+    if seed is None:
+        seed = fresh_seed()
+    stream_a = BotRandom(derive_seed(seed, 0))
+    stream_b = BotRandom(derive_seed(seed, 1))
+    trembles = random.Random(derive_seed(seed, "noise")).random if noise else None
+    meter = Meter(budget, (seed, noise)) if budget is not None else None
+    memory = None
+    cap = budget.memory if budget is not None else None
+    if memory_a is not None or memory_b is not None or cap is not None:
+        memory = MemoryMeter(cap, memory_a, memory_b)
+    try:
+        for wrapper in (memory, meter):
+            if wrapper is not None:
+                cls_a = wrapper.wrap(0, cls_a)
+                cls_b = wrapper.wrap(1, cls_b)
+        bot_a = _construct(0, stream_a, cls_a)
+        bot_b = _construct(1, stream_b, cls_b)
+
+        begin_a, begin_b = bot_a.begin, bot_b.begin
+        turn_a = bot_a.turn if profile_a is None else profile_a.wrap(bot_a.turn)
+        turn_b = bot_b.turn if profile_b is None else profile_b.wrap(bot_b.turn)
+        observe_a = getattr(bot_a, "observe", None)
+        observe_b = getattr(bot_b, "observe", None)
+        if observe_a is not None and profile_a is not None:
+            observe_a = profile_a.wrap_observe(observe_a)
+        if observe_b is not None and profile_b is not None:
+            observe_b = profile_b.wrap_observe(observe_b)
+        for wrapper in (memory, meter):
+            if wrapper is not None:
+                begin_a, turn_a = wrapper.wrap(0, begin_a), wrapper.wrap(0, turn_a)
+                begin_b, turn_b = wrapper.wrap(1, begin_b), wrapper.wrap(1, turn_b)
+        # observe() is charged like any call, but gets moves rather than a
+        # history to sample at; the turn() after it takes the sample.
+        if memory is not None:
+            if observe_a is not None:
+                observe_a = memory.wrap(0, observe_a, sample=False)
+            if observe_b is not None:
+                observe_b = memory.wrap(1, observe_b, sample=False)
+        if meter is not None:
+            if observe_a is not None:
+                observe_a = meter.wrap(0, observe_a)
+            if observe_b is not None:
+                observe_b = meter.wrap(1, observe_b)
+        history = HistoryBuffer()
+        live_a = history.live(0) if observe_a is not None else None
+        live_b = history.live(1) if observe_b is not None else None
+        score_a = score_b = 0
+        extrapolated = 0
+
+        fingerprint_a = getattr(bot_a, "fingerprint", None)
+        fingerprint_b = getattr(bot_b, "fingerprint", None)
+        detector = None
+        if (
+            extrapolate
+            and not noise
+            and fingerprint_a is not None
+            and fingerprint_b is not None
+            and profile_a is None
+            and profile_b is None
+            and trace is None
+        ):
+            detector = CycleDetector(rounds, SPOT_CHECK_CYCLES)
+
+        move_a = _call(0, stream_a, begin_a)
+        move_b = _call(1, stream_b, begin_b)
+        for t in range(rounds):
+            if history:
+                if detector is not None:
+                    state = (
+                        _fingerprint(0, stream_a, fingerprint_a),
+                        _fingerprint(1, stream_b, fingerprint_b),
+                        move_a,
+                        move_b,
+                    )
+                    tail = detector.check(state)
+                    if tail is not None:
+                        score_a += tail[0]
+                        score_b += tail[1]
+                        extrapolated = rounds - t
+                        break
+                move_a = _call(0, stream_a, turn_a, history.view(0) if live_a is None else live_a)
+                move_b = _call(1, stream_b, turn_b, history.view(1) if live_b is None else live_b)
+            if trembles is not None:
+                if trembles() < noise:
+                    move_a = _FLIP[move_a]
+                if trembles() < noise:
+                    move_b = _FLIP[move_b]
+            history.append(move_a, move_b)
+            if observe_a is not None:
+                _observe(0, stream_a, observe_a, move_a, move_b)
+            if observe_b is not None:
+                _observe(1, stream_b, observe_b, move_b, move_a)
+            if trace is not None:
+                trace.append(MOVE_BITS[move_a], MOVE_BITS[move_b])
+            payoff_a, payoff_b = PAYOFFS[move_a][move_b]
+            score_a += payoff_a
+            score_b += payoff_b
+            if detector is not None:
+                detector.record(2 * MOVE_BITS[move_a] + MOVE_BITS[move_b], payoff_a, payoff_b)
+                if not detector.active:
+                    detector = None
+    finally:
+        activate(None)
+        if meter is not None:
+            meter.close()
+        if memory is not None:
+            memory.close()
+
+    for profile in (profile_a, profile_b):
+        if profile is not None:
+            profile.finish()
+    return MatchResult(score_a, score_b, rounds, seed, extrapolated)
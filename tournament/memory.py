@@ -0,0 +1,191 @@
+"""Memory held by each bot during a match, measured with tracemalloc.
+
+Bots keep very different amounts of state, from nothing to full copies of
+the history. A MemoryMeter wraps every call into a bot, as a TurnProfile
+does for time. Each call is charged with the change in traced memory across
+it, so a side's running total is what that bot still holds from everything
+it allocated, and the high-water mark inside the call gives its peak.
+Memory the engine allocates between calls, such as the history itself, is
+never charged to a bot.
+
+tracemalloc counts every allocation in the process. That makes it slow, and
+it means matches measured this way must not run side by side in one process.
+The runner therefore only measures every ``memory_every``-th match (and every
+match when a memory cap is set), one match at a time per process. A
+MemoryProfile samples the held total into per-block means over the round
+index. A slope well above zero means the bot's state grows with the match.
+"""
+
+import functools
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from .budget import BudgetExceeded
+
+BLOCK = 100
+# Bytes per round above which held memory counts as growing; one list
+# append per round already costs 8.
+GROWTH_THRESHOLD = 4.0
+CALIBRATION_READINGS = 5
+
+
+class MemoryProfile:
+    """Memory record for one bot, over one or more matches."""
+
+    def __init__(self) -> None:
+        self.matches = 0
+        # Most bytes the bot held at once, including peaks inside a call.
+        self.peak = 0
+        # block_bytes[k] / block_samples[k] is the mean held over rounds
+        # [k * BLOCK, (k + 1) * BLOCK).
+        self.block_bytes: List[int] = []
+        self.block_samples: List[int] = []
+
+    def record(self, round_index: int, held: int) -> None:
+        block = round_index // BLOCK
+        if block >= len(self.block_bytes):
+            grow = block + 1 - len(self.block_bytes)
+            self.block_bytes.extend([0] * grow)
+            self.block_samples.extend([0] * grow)
+        self.block_bytes[block] += held
+        self.block_samples[block] += 1
+
+    def finish(self, peak: int) -> None:
+        """Count one more match, whose peak was ``peak`` bytes."""
+        self.matches += 1
+        self.peak = max(self.peak, peak)
+
+    def merge(self, other: "MemoryProfile") -> None:
+        self.matches += other.matches
+        self.peak = max(self.peak, other.peak)
+        if len(other.block_bytes) > len(self.block_bytes):
+            grow = len(other.block_bytes) - len(self.block_bytes)
+            self.block_bytes.extend([0] * grow)
+            self.block_samples.extend([0] * grow)
+        for k, (held, samples) in enumerate(zip(other.block_bytes, other.block_samples)):
+            self.block_bytes[k] += held
+            self.block_samples[k] += samples
+
+    def steady_state(self) -> Optional[float]:
+        """Mean bytes held over the last block of rounds."""
+        for held, samples in zip(reversed(self.block_bytes), reversed(self.block_samples)):
+            if samples:
+                return held / samples
+        return None
+
+    def growth(self) -> Optional[float]:
+        """Least-squares slope of mean bytes held against round index.
+
+        The first block is skipped as warm-up. Returns None with fewer than
+        three usable blocks.
+        """
+        points = [
+            ((k + 0.5) * BLOCK, held / samples)
+            for k, (held, samples) in enumerate(zip(self.block_bytes, self.block_samples))
+            if k > 0 and samples
+        ]
+        if len(points) < 3:
+            return None
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        return sxy / sxx
+
+    def grows(self, threshold: float = GROWTH_THRESHOLD) -> bool:
+        slope = self.growth()
+        return slope is not None and slope > threshold
+
+
+class MemoryMeter:
+    """Both sides' memory in one match, with an optional cap in bytes.
+
+    A bot whose peak goes over ``cap`` raises BudgetExceeded once the call
+    that went over returns.
+    """
+
+    def __init__(
+        self,
+        cap: Optional[int],
+        profile_a: Optional[MemoryProfile] = None,
+        profile_b: Optional[MemoryProfile] = None,
+    ) -> None:
+        self.cap = cap
+        self.profiles = (profile_a, profile_b)
+        self.held = [0, 0]
+        self.peak = [0, 0]
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        # Reading the counter can allocate the int that holds the reading.
+        # Charge calls net of that: the least change over a few readings
+        # with nothing in between.
+        self._bias = min(self._empty_reading() for _ in range(CALIBRATION_READINGS))
+
+    @staticmethod
+    def _empty_reading() -> int:
+        before = tracemalloc.get_traced_memory()[0]
+        return tracemalloc.get_traced_memory()[0] - before
+
+    def wrap(self, side: int, fn: Callable, sample: bool = True) -> Callable:
+        """``fn``, charged to ``side``.
+
+        With ``sample``, the first argument is the history (or absent, for
+        round 0) and the held total is recorded at its length.
+        """
+
+        @functools.wraps(fn)
+        def measured(*args: Any) -> Any:
+            return self.run(side, fn, args, sample)
+
+        return measured
+
+    def run(self, side: int, fn: Callable, args: tuple, sample: bool = True) -> Any:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            result = fn(*args)
+        finally:
+            current, high = tracemalloc.get_traced_memory()
+            held = self.held[side]
+            self.held[side] = held + current - before - self._bias
+            self.peak[side] = max(self.peak[side], held + high - before - self._bias)
+            profile = self.profiles[side]
+            # turn() gets the history; construction and begin() are round 0.
+            if profile is not None and sample:
+                profile.record(len(args[0]) if args else 0, self.held[side])
+        if self.cap is not None and self.peak[side] > self.cap:
+            raise BudgetExceeded(
+                side,
+                f"held {self.peak[side] / 2**20:.3g} MB, over the "
+                f"{self.cap / 2**20:.3g} MB memory cap",
+            )
+        return result
+
+    def close(self) -> None:
+        for profile, peak in zip(self.profiles, self.peak):
+            if profile is not None:
+                profile.finish(peak)
+        if self._started:
+            tracemalloc.stop()
+
+
+def format_memory_report(profiles: Dict[str, MemoryProfile]) -> str:
+    """One line per bot, largest peak first."""
+    width = max((len(name) for name in profiles), default=0)
+    lines = [
+        f"{'bot':<{width}}  {'matches':>7}  {'peak KB':>9}  {'steady KB':>9}  {'B/round':>7}"
+    ]
+    ranked = sorted(profiles.items(), key=lambda item: -item[1].peak)
+    for name, profile in ranked:
+        if not profile.matches:
+            continue
+        steady = profile.steady_state()
+        slope = profile.growth()
+        growth = "-" if slope is None else f"{slope:.1f}"
+        flag = "  GROWS" if profile.grows() else ""
+        lines.append(
+            f"{name:<{width}}  {profile.matches:>7}  {profile.peak / 1024:>9.1f}  "
+            f"{'-' if steady is None else f'{steady / 1024:.1f}':>9}  {growth:>7}{flag}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,111 @@
+"""Find a period in the opponent's moves as they arrive.
+
+Bots that look for a repeating opponent compare the last block of moves with
+the one before it, for every block length, every turn, or count defections at
+each position modulo every candidate period over the whole history. A
+PeriodDetector keeps both kinds of evidence up to date in O(max_period) per
+round:
+
+* for every lag ``k`` up to ``max_period``, how many of the last ``window``
+  moves equal the move ``k`` rounds earlier. A sequence with period ``k``
+  scores 1 at lag ``k``, so the best lag is the period and its score the
+  confidence, and the move ``k`` rounds back predicts the next one;
+* for every ``k``, the defections at each residue of the round index modulo
+  ``k`` over the whole match, for opponents that defect on a schedule.
+
+``history.periods`` in ``turn()`` is one kept by the engine for the bot's
+opponent, built on first use like ``history.stats``. Moves are 0 (C) / 1 (D).
+"""
+
+from typing import List, Optional, Tuple
+
+MAX_PERIOD = 8
+WINDOW = 100
+
+
+class PeriodDetector:
+    """Lag-match scores and per-residue counts of one sequence of moves."""
+
+    __slots__ = ("max_period", "window", "rounds", "matches", "defections", "_ring")
+
+    def __init__(self, max_period: int = MAX_PERIOD, window: int = WINDOW) -> None:
+        self.max_period = max_period
+        self.window = window
+        self.rounds = 0
+        # matches[k]: moves among the last ``window`` that repeat the move k
+        # rounds before them (index 0 unused).
+        self.matches = [0] * (max_period + 1)
+        # defections[k][r]: defections in rounds t with t % k == r.
+        self.defections = [[0] * k for k in range(max_period + 1)]
+        # The last window + max_period + 1 moves, indexed by round.
+        self._ring = bytearray(window + max_period + 1)
+
+    def update(self, move: int) -> None:
+        """Add the next move."""
+        t = self.rounds
+        ring = self._ring
+        size = len(ring)
+        matches = self.matches
+        # The comparison made ``window`` rounds ago drops out of the window.
+        old = t - self.window
+        for k in range(1, min(t, self.max_period) + 1):
+            matches[k] += move == ring[(t - k) % size]
+            if old >= k:
+                matches[k] -= ring[old % size] == ring[(old - k) % size]
+        ring[t % size] = move
+        if move:
+            defections = self.defections
+            for k in range(1, self.max_period + 1):
+                defections[k][t % k] += 1
+        self.rounds = t + 1
+
+    def samples(self, k: int) -> int:
+        """Comparisons behind ``matches[k]``."""
+        return max(0, min(self.window, self.rounds - k))
+
+    def score(self, k: int) -> float:
+        """Share of recent moves that repeat the move ``k`` rounds earlier."""
+        samples = self.samples(k)
+        return self.matches[k] / samples if samples else 0.0
+
+    def best(self) -> Tuple[Optional[int], float]:
+        """The period that best explains recent moves, and its score.
+
+        Only periods seen at least twice count. Ties go to the shorter
+        period, since a sequence with period ``k`` also repeats at ``2k``.
+        Returns ``(None, 0.0)`` before any period has been seen twice.
+        """
+        best_period, best_score = None, 0.0
+        for k in range(1, min(self.max_period, self.rounds // 2) + 1):
+            score = self.score(k)
+            if score > best_score:
+                best_period, best_score = k, score
+        return best_period, best_score
+
+    def predict(self, min_confidence: float = 0.0) -> Optional[int]:
+        """The next move if the best period holds, or None below ``min_confidence``."""
+        period, confidence = self.best()
+        if period is None or confidence < min_confidence:
+            return None
+        return self._ring[(self.rounds - period) % len(self._ring)]
+
+    def residue_rates(self, k: int) -> List[float]:
+        """Defection rate at each residue of the round index modulo ``k``."""
+        full, extra = divmod(self.rounds, k)
+        return [
+            count / (full + (r < extra)) if full + (r < extra) else 0.0
+            for r, count in enumerate(self.defections[k])
+        ]
+
+    def concentration(self, k: int) -> Tuple[int, float]:
+        """The residue modulo ``k`` where defections cluster, and by how much.
+
+        The margin is that residue's defection rate minus the mean rate of
+        the others: near 1 for an opponent that defects exactly every
+        ``k``-th round, near 0 without a schedule.
+        """
+        rates = self.residue_rates(k)
+        residue = max(range(k), key=rates.__getitem__)
+        if k == 1:
+            return residue, 0.0
+        return residue, rates[residue] - (sum(rates) - rates[residue]) / (k - 1)
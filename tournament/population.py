@@ -0,0 +1,178 @@
+"""Evolutionary dynamics over a tournament's payoff matrix, as NumPy arrays.
+
+Nothing here plays a match. A TournamentResult (or a ``table_tournament``
+matrix from ``vectorized``) already says how well every bot does against
+every other bot, so population-level questions reduce to linear algebra on
+that matrix. Can an exploiter invade a population of cooperators? Which mix
+is stable?
+
+``replicator_dynamics`` evolves the strategy frequencies of an infinite
+population in discrete generations, for many starting mixes at once.
+``moran_process`` simulates a finite population of ``N`` individuals under
+birth-death selection, with independent runs laid out along the first array
+axis so thousands of them advance together. ``invasion`` uses it to estimate
+how often a single mutant takes over a resident population.
+
+Requires numpy.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from .tournament import TournamentResult
+
+
+def payoff_matrix(
+    result: TournamentResult, complete_only: bool = True
+) -> Tuple[List[str], np.ndarray]:
+    """Mean payoff per round of each entrant (row) against each other (column).
+
+    Forfeited matches count with their forfeit scores; pairings that were
+    never played are NaN. With ``complete_only``, the entrants with the most NaN
+    cells are dropped one at a time until none are left, so the matrix can be
+    fed to the dynamics directly.
+    """
+    n = len(result.names)
+    totals = np.array(
+        [[np.nan if score is None else score for score in row] for row in result.matrix],
+        dtype=np.float64,
+    )
+    payoffs = totals / (result.repetitions * result.rounds)
+    names = list(result.names)
+    if complete_only:
+        keep = np.ones(n, dtype=bool)
+        while True:
+            sub = np.isnan(payoffs[np.ix_(keep, keep)])
+            missing = sub.sum(axis=0) + sub.sum(axis=1)
+            if not missing.any():
+                break
+            keep[np.flatnonzero(keep)[missing.argmax()]] = False
+        names = [name for name, k in zip(names, keep) if k]
+        payoffs = payoffs[np.ix_(keep, keep)]
+    return names, payoffs
+
+
+def _check(payoffs: np.ndarray) -> np.ndarray:
+    payoffs = np.asarray(payoffs, dtype=np.float64)
+    if payoffs.ndim != 2 or payoffs.shape[0] != payoffs.shape[1]:
+        raise ValueError("payoffs must be a square matrix")
+    if np.isnan(payoffs).any():
+        raise ValueError("payoffs contain NaN; use payoff_matrix(..., complete_only=True)")
+    return payoffs
+
+
+def replicator_dynamics(
+    payoffs: np.ndarray,
+    start: Optional[np.ndarray] = None,
+    generations: int = 1000,
+    record_every: int = 1,
+) -> np.ndarray:
+    """Discrete-time replicator dynamics, ``x'_i = x_i f_i / mean(f)``.
+
+    ``f_i`` is the expected payoff of strategy ``i`` against the current mix.
+    ``start`` holds starting frequencies, shape ``(n,)`` or ``(batch, n)``;
+    rows are normalized, and the default is the uniform mix. Returns the
+    frequencies every ``record_every`` generations, starting with
+    generation 0: shape ``(records, n)`` or ``(records, batch, n)``.
+    Payoffs must be non-negative, as they are for this game.
+    """
+    payoffs = _check(payoffs)
+    n = payoffs.shape[0]
+    x = np.full(n, 1.0 / n) if start is None else np.asarray(start, dtype=np.float64)
+    x = x / x.sum(axis=-1, keepdims=True)
+    records = [x]
+    for generation in range(1, generations + 1):
+        fitness = x @ payoffs.T
+        mean = (x * fitness).sum(axis=-1, keepdims=True)
+        x = x * fitness / np.maximum(mean, np.finfo(np.float64).tiny)
+        if generation % record_every == 0:
+            records.append(x)
+    return np.stack(records)
+
+
+@dataclass
+class MoranResult:
+    # counts[r, i] is the number of strategy-i individuals at the end of run r.
+    counts: np.ndarray
+    # fixed[r] is the strategy that took over run r, or -1 if none did.
+    fixed: np.ndarray
+    # steps[r] is the birth-death step at which run r fixed (or the total).
+    steps: np.ndarray
+
+
+def moran_process(
+    payoffs: np.ndarray,
+    counts: np.ndarray,
+    steps: int,
+    runs: int = 1,
+    selection: float = 1.0,
+    seed: Optional[int] = None,
+) -> MoranResult:
+    """Birth-death Moran process in a well-mixed population of ``sum(counts)``.
+
+    Every step, each individual's payoff is its mean against the rest of the
+    population (self-interaction excluded), fitness is ``1 - selection +
+    selection * payoff``, one individual is chosen to reproduce in proportion
+    to fitness, and its offspring replaces an individual chosen uniformly.
+    ``counts`` is the starting count of each strategy, shape ``(n,)`` (shared
+    by all ``runs``) or ``(runs, n)``. Runs stop changing once one strategy
+    has taken over.
+    """
+    payoffs = _check(payoffs)
+    n = payoffs.shape[0]
+    counts = np.broadcast_to(np.asarray(counts, dtype=np.int64), (runs, n)).copy()
+    size = int(counts[0].sum())
+    if size < 2 or (counts.sum(axis=1) != size).any():
+        raise ValueError("every run needs the same population size, at least 2")
+    rng = np.random.default_rng(seed)
+    rows = np.arange(runs)
+    diagonal = np.diag(payoffs)
+    fixed_at = np.full(runs, steps, dtype=np.int64)
+    active = (counts < size).all(axis=1)
+    fixed_at[~active] = 0
+
+    for step in range(steps):
+        if not active.any():
+            break
+        payoff = (counts @ payoffs.T - diagonal) / (size - 1)
+        fitness = np.maximum(1.0 - selection + selection * payoff, 0.0)
+        weights = counts * fitness
+        birth = np.cumsum(weights, axis=1)
+        parent = (birth < rng.random(runs)[:, None] * birth[:, -1:]).sum(axis=1)
+        death = np.cumsum(counts, axis=1)
+        dying = (death <= rng.integers(0, size, runs)[:, None]).sum(axis=1)
+        change = active.astype(np.int64)
+        counts[rows, parent] += change
+        counts[rows, dying] -= change
+        done = active & (counts == size).any(axis=1)
+        fixed_at[done] = step + 1
+        active &= ~done
+
+    winners = np.where((counts == size).any(axis=1), counts.argmax(axis=1), -1)
+    return MoranResult(counts, winners, fixed_at)
+
+
+def invasion(
+    payoffs: np.ndarray,
+    resident: int,
+    mutant: int,
+    size: int = 100,
+    runs: int = 1000,
+    steps: Optional[int] = None,
+    selection: float = 1.0,
+    seed: Optional[int] = None,
+) -> float:
+    """Fraction of runs in which one ``mutant`` takes over ``size - 1`` residents.
+
+    Compare with ``1 / size``, the fixation probability of a neutral mutant.
+    ``steps`` defaults to ``50 * size ** 2``, past which almost every run has
+    fixed; runs still mixed at the end count as failed invasions.
+    """
+    payoffs = _check(payoffs)
+    if steps is None:
+        steps = 50 * size * size
+    pair = np.ix_([resident, mutant], [resident, mutant])
+    result = moran_process(payoffs[pair], np.array([size - 1, 1]), steps, runs, selection, seed)
+    return float((result.fixed == 1).mean())
@@ -0,0 +1,254 @@
+"""Online logistic prediction of the opponent's next move, on NumPy arrays.
+
+Some bots fit a small logistic model of "will the opponent defect next?" and
+update it every turn with a Python loop over the weights. Here the model is a
+row of a NumPy array, and the features come straight from the engine's round
+codes: a one-hot encoding of the last ``depth`` outcomes (CC, CD, DC, DD, from
+the bot's side), the opponent's defection rate, its mirror ratio (see
+``stats``) and a bias.
+
+A LogisticPredictor holds one row of weights per match, so when many matches
+of the same bot advance in lockstep, predicting and learning for all of them
+are one array operation each. ``play_predictor_batch`` does that for a
+predicting bot against memory-one tables, on the batch engine of
+``vectorized``. A Python bot uses an OnlinePredictor, which is the same model
+with a single row, fed from the history it is given. PredictorBot is the
+batch's predicting bot written that way; ``python -m tournament.predictor``
+plays it on the match engine against deterministic tables and checks that
+every score agrees with the batch.
+
+Moves are encoded as 0 for COOPERATE and 1 for DEFECT. Requires numpy.
+"""
+
+import argparse
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from ping_game_theory import History, Move, Strategy
+
+from .match import ROUNDS, play_match
+from .vectorized import (
+    ALWAYS_COOPERATE,
+    ALWAYS_DEFECT,
+    PAYOFF,
+    TIT_FOR_TAT,
+    WIN_STAY_LOSE_SHIFT,
+    BatchResult,
+    TableStrategy,
+    stack_tables,
+    submission_tables,
+    table_bot,
+)
+
+DEPTH = 4
+LEARNING_RATE = 0.2
+# Weights shrink by this factor every update, so old evidence fades.
+DECAY = 0.9995
+
+_BLOCK = 1024
+
+
+def feature_count(depth: int = DEPTH) -> int:
+    return 4 * depth + 3
+
+
+def encode(codes: np.ndarray, defect_rate: np.ndarray, mirror_ratio: np.ndarray) -> np.ndarray:
+    """Feature rows for a batch of matches.
+
+    ``codes[k, i]`` is the code ``2 * mine + theirs`` of the round ``i + 1``
+    rounds before now in match ``k``, or -1 before the first round.
+    """
+    matches, depth = codes.shape
+    x = np.zeros((matches, feature_count(depth)))
+    rows, lags = np.nonzero(codes >= 0)
+    x[rows, 4 * lags + codes[rows, lags]] = 1.0
+    x[:, -3] = defect_rate
+    x[:, -2] = mirror_ratio
+    x[:, -1] = 1.0
+    return x
+
+
+class LogisticPredictor:
+    """P(opponent defects next round), one logistic model per match."""
+
+    def __init__(
+        self,
+        matches: int = 1,
+        depth: int = DEPTH,
+        learning_rate: float = LEARNING_RATE,
+        decay: float = DECAY,
+    ) -> None:
+        self.depth = depth
+        self.learning_rate = learning_rate
+        self.decay = decay
+        self.updates = 0
+        self.weights = np.zeros((matches, feature_count(depth)))
+
+    def predict(self, x: np.ndarray) -> np.ndarray:
+        """Probability of a defection, for each row of ``x``."""
+        z = np.einsum("mf,mf->m", self.weights, x)
+        return 1.0 / (1.0 + np.exp(-np.clip(z, -20.0, 20.0)))
+
+    def learn(self, x: np.ndarray, defected: np.ndarray) -> None:
+        """One logistic-loss gradient step per row, towards ``defected`` (0 or 1)."""
+        error = defected - self.predict(x)
+        self.updates += 1
+        rate = self.learning_rate / np.sqrt(1.0 + 0.0005 * self.updates)
+        self.weights *= self.decay
+        self.weights += (rate * error)[:, None] * x
+
+
+class OnlinePredictor:
+    """A single-match LogisticPredictor for use inside ``turn()``.
+
+    Needs the engine's history (``tail_codes`` and ``stats``), not the
+    tuple StrategyTester passes.
+    """
+
+    def __init__(self, depth: int = DEPTH, **options: float) -> None:
+        self.model = LogisticPredictor(1, depth, **options)
+        self._codes = np.full((1, depth), -1, dtype=np.intp)
+        # Features of the round about to be played after ``_pending_round``
+        # rounds; the model learns from them once that round is in.
+        self._pending = encode(self._codes, np.zeros(1), np.zeros(1))
+        self._pending_round = 0
+
+    def first(self) -> float:
+        """The prediction for the first round, for ``begin()``."""
+        return float(self.model.predict(self._pending)[0])
+
+    def step(self, history: History) -> float:
+        """Learn from the opponent's last move, then predict its next one.
+
+        Call once per turn. Returns the probability that the opponent
+        defects in the coming round. Rounds played between calls that
+        skipped a turn are not learned from.
+        """
+        rounds = len(history)
+        recent = history.tail_codes(self.model.depth)
+        if rounds == self._pending_round + 1:
+            self.model.learn(self._pending, np.array([recent[-1] & 1]))
+        codes = self._codes
+        codes.fill(-1)
+        codes[0, : len(recent)] = np.frombuffer(recent, dtype=np.uint8)[::-1]
+        stats = history.stats
+        self._pending = encode(codes, np.array([stats.defect_rate]), np.array([stats.mirror_ratio]))
+        self._pending_round = rounds
+        return float(self.model.predict(self._pending)[0])
+
+
+class PredictorBot(Strategy):
+    """The predicting bot of ``play_predictor_batch``, one match at a time."""
+
+    def __init__(self) -> None:
+        self.predictor = OnlinePredictor()
+
+    def begin(self) -> Move:
+        return Move.DEFECT if self.predictor.first() > 0.5 else Move.COOPERATE
+
+    def turn(self, history: History) -> Move:
+        return Move.DEFECT if self.predictor.step(history) > 0.5 else Move.COOPERATE
+
+
+def play_predictor_batch(
+    opponents: Sequence[TableStrategy],
+    rounds: int = ROUNDS,
+    depth: int = DEPTH,
+    noise: float = 0.0,
+    seed: Optional[int] = None,
+    keep_moves: bool = False,
+) -> BatchResult:
+    """Match k between a predicting bot (side a) and ``opponents[k]``, for all k.
+
+    The predicting bot plays the move it expects from the opponent: it
+    cooperates unless a defection is more likely than not, so it is
+    tit-for-tat driven by the model rather than by the last round alone. It
+    learns after every round, for all matches at once.
+    """
+    m = len(opponents)
+    first_b, table_b = stack_tables(opponents)
+    stochastic = not all(s.deterministic for s in opponents)
+    rng = np.random.default_rng(seed)
+    rows = np.arange(m)
+    model = LogisticPredictor(m, depth)
+
+    scores = np.zeros((m, 2), dtype=np.int64)
+    moves = np.empty((m, rounds, 2), dtype=np.uint8) if keep_moves else None
+    # Codes of the last ``depth`` rounds, most recent first, from side a.
+    codes = np.full((m, depth), -1, dtype=np.intp)
+    defections = np.zeros(m)
+    mirrors = np.zeros(m)
+    a = b = None
+    no_rate = np.zeros(m)
+    for block_start in range(0, rounds, _BLOCK):
+        block = min(_BLOCK, rounds - block_start)
+        draws = rng.random((block, m)) if stochastic else np.full((block, m), 0.5)
+        flips = rng.random((block, 2, m)) < noise if noise > 0 else None
+        for i in range(block):
+            t = block_start + i
+            x = encode(
+                codes,
+                defections / t if t else no_rate,
+                mirrors / (t - 1) if t > 1 else no_rate,
+            )
+            p_b = first_b if b is None else table_b[rows, 2 * b + a]
+            previous = a
+            a = (model.predict(x) > 0.5).astype(np.intp)
+            b = (draws[i] < p_b).astype(np.intp)
+            if flips is not None:
+                a ^= flips[i, 0]
+                b ^= flips[i, 1]
+            model.learn(x, b)
+            if previous is not None:
+                mirrors += b == previous
+            defections += b
+            codes[:, 1:] = codes[:, :-1]
+            codes[:, 0] = 2 * a + b
+            scores[:, 0] += PAYOFF[a, b]
+            scores[:, 1] += PAYOFF[b, a]
+            if moves is not None:
+                moves[:, t, 0] = a
+                moves[:, t, 1] = b
+    return BatchResult(scores, moves)
+
+
+def check(opponents: Sequence[TableStrategy], rounds: int = ROUNDS) -> List[str]:
+    """Opponents against which PredictorBot and the batch score differently.
+
+    The opponents must be deterministic, so that both engines play the same
+    moves.
+    """
+    batch = play_predictor_batch(opponents, rounds)
+    mismatches = []
+    for opponent, expected in zip(opponents, batch.scores):
+        match = play_match(PredictorBot, table_bot(opponent), rounds, seed=0)
+        if (match.score_a, match.score_b) != tuple(expected):
+            mismatches.append(
+                f"{opponent.name}: bot {match.score_a}-{match.score_b}, "
+                f"batch {expected[0]}-{expected[1]}"
+            )
+    return mismatches
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m tournament.predictor")
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+    opponents = [
+        ALWAYS_COOPERATE,
+        ALWAYS_DEFECT,
+        TIT_FOR_TAT,
+        WIN_STAY_LOSE_SHIFT,
+        *submission_tables(rounds=args.rounds).values(),
+    ]
+    mismatches = check(opponents, args.rounds)
+    if mismatches:
+        print("\n".join(mismatches), file=sys.stderr)
+        sys.exit(1)
+    print(f"PredictorBot matches the batch against {len(opponents)} tables")
+
+
+if __name__ == "__main__":
+    main()
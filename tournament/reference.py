@@ -0,0 +1,92 @@
+"""Classic reference strategies, used as fixed opponents by benchmarks and studies.
+
+The deterministic ones define ``fingerprint()``, so matches between them stop
+once they settle into a cycle (see ``cycles``).
+"""
+
+from ping_game_theory import History, Move, Strategy
+
+from .rng import bot_random as random
+
+
+class AlwaysCooperate(Strategy):
+    def __init__(self) -> None:
+        self.author_netid = ""
+        self.strategy_name = "always-cooperate"
+        self.strategy_desc = "Always cooperates."
+
+    def begin(self) -> Move:
+        return Move.COOPERATE
+
+    def turn(self, history: History) -> Move:
+        return Move.COOPERATE
+
+    def fingerprint(self) -> tuple:
+        return ()
+
+
+class AlwaysDefect(Strategy):
+    def __init__(self) -> None:
+        self.author_netid = ""
+        self.strategy_name = "always-defect"
+        self.strategy_desc = "Always defects."
+
+    def begin(self) -> Move:
+        return Move.DEFECT
+
+    def turn(self, history: History) -> Move:
+        return Move.DEFECT
+
+    def fingerprint(self) -> tuple:
+        return ()
+
+
+class TitForTat(Strategy):
+    def __init__(self) -> None:
+        self.author_netid = ""
+        self.strategy_name = "tit-for-tat"
+        self.strategy_desc = "Cooperates first, then copies the opponent's last move."
+
+    def begin(self) -> Move:
+        return Move.COOPERATE
+
+    def turn(self, history: History) -> Move:
+        return history[-1].other
+
+    def fingerprint(self) -> tuple:
+        return ()
+
+
+class WinStayLoseShift(Strategy):
+    def __init__(self) -> None:
+        self.author_netid = ""
+        self.strategy_name = "win-stay-lose-shift"
+        self.strategy_desc = "Repeats its move after C/C or D/C, switches otherwise."
+
+    def begin(self) -> Move:
+        return Move.COOPERATE
+
+    def turn(self, history: History) -> Move:
+        last = history[-1]
+        if last.other == Move.COOPERATE:
+            return last.self
+        return Move.DEFECT if last.self == Move.COOPERATE else Move.COOPERATE
+
+    def fingerprint(self) -> tuple:
+        return ()
+
+
+class Random(Strategy):
+    def __init__(self) -> None:
+        self.author_netid = ""
+        self.strategy_name = "random"
+        self.strategy_desc = "Cooperates or defects with equal probability."
+
+    def begin(self) -> Move:
+        return random.choice((Move.COOPERATE, Move.DEFECT))
+
+    def turn(self, history: History) -> Move:
+        return self.begin()
+
+
+REFERENCE_POOL = [AlwaysCooperate, AlwaysDefect, TitForTat, WinStayLoseShift, Random]
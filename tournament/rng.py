@@ -0,0 +1,139 @@
+"""Reproducible, per-bot random streams for bots that use the ``random`` module.
+
+Submissions call the module-level functions of ``random``, which all share one
+hidden generator; some even call ``random.seed()`` to reseed it from OS
+entropy. Scores would then depend on which matches happen to share a worker
+process, and no match from a parallel run could be replayed.
+
+The loader rebinds every reference to ``random`` in a submission's globals to
+``bot_random``, a stand-in module whose generator functions act on whichever
+stream the engine last activated in the calling thread. The engine gives each
+bot in a match its own BotRandom, seeded from the match seed, and activates it
+around every call into that bot. BotRandom.seed() without an argument draws
+the new seed from the stream itself instead of the OS, so reseeding stays
+reproducible. While ``fsm`` probes a bot, the active stream is a NoRandom,
+which fails on any draw.
+"""
+
+import hashlib
+import random
+import secrets
+import threading
+import types
+from typing import Any, Dict, Optional
+
+_GLOBAL = random.random.__self__
+
+# Module-level functions of ``random`` that are bound to the hidden generator.
+_STREAM_FUNCTIONS = frozenset(
+    name
+    for name in dir(random)
+    if getattr(getattr(random, name), "__self__", None) is _GLOBAL
+)
+
+
+def derive_seed(*parts: Any) -> int:
+    """Stable 64-bit seed from any printable parts."""
+    text = ":".join(str(part) for part in parts).encode()
+    return int.from_bytes(hashlib.blake2b(text, digest_size=8).digest(), "big")
+
+
+def fresh_seed() -> int:
+    return secrets.randbits(64)
+
+
+def match_seed(seed: int, name_a: str, name_b: str, repetition: int = 0) -> int:
+    """Seed of one (pairing, repetition) of a tournament run with ``seed``."""
+    return derive_seed(seed, name_a, name_b, repetition)
+
+
+class BotRandom(random.Random):
+    """One bot's random stream within one match."""
+
+    def __init__(self, seed: int) -> None:
+        self._base = seed
+        self._reseeds = 0
+        # Where this bot's next bytes start in the shared entropy pool.
+        self.entropy_cursor = derive_seed(seed, "entropy")
+        super().__init__(seed)
+
+    def seed(self, a=None, version: int = 2) -> None:
+        if a is None:
+            self._reseeds += 1
+            a = derive_seed(self._base, "reseed", self._reseeds)
+        super().seed(a, version)
+
+
+class RandomDraw(Exception):
+    """A bot drew randomness from a NoRandom stream."""
+
+
+class NoRandom(random.Random):
+    """A stream that refuses every draw, for proving a bot deterministic.
+
+    A draw raises RandomDraw and sets ``drawn``, so a bot that catches the
+    exception is still found out.
+    """
+
+    drawn = False
+
+    def _refuse(self) -> None:
+        self.drawn = True
+        raise RandomDraw("the bot drew randomness")
+
+    def random(self) -> float:
+        self._refuse()
+
+    def getrandbits(self, k: int) -> int:
+        self._refuse()
+
+    def randbytes(self, n: int) -> bytes:
+        self._refuse()
+
+
+class _Active(threading.local):
+    # Per thread, so matches played side by side (see ``executor``) never
+    # draw from each other's streams.
+    stream: random.Random = _GLOBAL
+
+
+_active = _Active()
+
+
+def activate(stream: Optional[random.Random]) -> None:
+    """Route ``bot_random`` in this thread to ``stream``, or back to the global generator."""
+    _active.stream = _GLOBAL if stream is None else stream
+
+
+def active() -> random.Random:
+    return _active.stream
+
+
+class _RandomModule(types.ModuleType):
+    def __getattr__(self, name: str) -> Any:
+        if name in _STREAM_FUNCTIONS:
+            return getattr(_active.stream, name)
+        return getattr(random, name)
+
+
+bot_random = _RandomModule("random", random.__doc__)
+
+
+class _StreamFunction:
+    # Stands in for names imported with ``from random import choice``.
+    __slots__ = ("name",)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        return getattr(_active.stream, self.name)(*args, **kwargs)
+
+
+def isolate_random(namespace: Dict[str, Any]) -> None:
+    """Point a module's references to ``random`` at the active bot stream."""
+    for key, value in list(namespace.items()):
+        if value is random:
+            namespace[key] = bot_random
+        elif getattr(value, "__self__", None) is _GLOBAL and callable(value):
+            namespace[key] = _StreamFunction(value.__name__)
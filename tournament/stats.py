@@ -0,0 +1,156 @@
+"""Running statistics of a match, as one bot sees it.
+
+Many bots rescan the whole history every turn to compute the same few
+numbers: the opponent's defection rate over the match and over a recent
+window, how often it changes its move, its current streak, counts of the
+four outcomes, and how often it copies the bot's previous move. An
+OpponentStats keeps all of them up to date in O(1) per round.
+
+``history.stats`` in ``turn()`` is one kept by the engine for that bot. It is
+only built once a bot first reads it, and then catches up with the rounds it
+has not seen, so bots that never read it pay nothing. Bots can also keep
+their own, for example with a different window, and ``update()`` it with the
+last round each turn.
+"""
+
+from ping_game_theory import Move
+
+# Rounds in the sliding window, unless a bot asks for another size.
+WINDOW = 100
+
+_MOVES = (Move.COOPERATE, Move.DEFECT)
+
+
+class OpponentStats:
+    """Counts over the rounds seen so far; moves are 0 (C) / 1 (D)."""
+
+    __slots__ = (
+        "window",
+        "rounds",
+        "defections",
+        "own_defections",
+        "changes",
+        "outcomes",
+        "replies",
+        "mirrors",
+        "streak",
+        "window_defections",
+        "_recent",
+        "_last_mine",
+        "_last_theirs",
+    )
+
+    def __init__(self, window: int = WINDOW) -> None:
+        self.window = window
+        self.rounds = 0
+        # Rounds the opponent, and the bot itself, defected in.
+        self.defections = 0
+        self.own_defections = 0
+        # Rounds in which the opponent played something else than the round before.
+        self.changes = 0
+        # outcomes[2 * mine + theirs]: the rounds that went CC, CD, DC and DD.
+        self.outcomes = [0, 0, 0, 0]
+        # replies[2 * mine + theirs]: the opponent played ``theirs`` the round
+        # after the bot played ``mine``.
+        self.replies = [0, 0, 0, 0]
+        # Rounds in which the opponent repeated the bot's previous move.
+        self.mirrors = 0
+        # Length of the opponent's current run of identical moves.
+        self.streak = 0
+        self.window_defections = 0
+        # The opponent's last ``window`` moves, as a ring indexed by round.
+        self._recent = bytearray(window)
+        self._last_mine = 0
+        self._last_theirs = 0
+
+    def update(self, mine: int, theirs: int) -> None:
+        """Add one round in which the bot played ``mine`` and the opponent ``theirs``."""
+        t = self.rounds
+        if t:
+            if theirs == self._last_theirs:
+                self.streak += 1
+            else:
+                self.changes += 1
+                self.streak = 1
+            self.replies[2 * self._last_mine + theirs] += 1
+            if theirs == self._last_mine:
+                self.mirrors += 1
+        else:
+            self.streak = 1
+        slot = t % self.window
+        if t >= self.window:
+            self.window_defections -= self._recent[slot]
+        self._recent[slot] = theirs
+        self.window_defections += theirs
+        self.defections += theirs
+        self.own_defections += mine
+        self.outcomes[2 * mine + theirs] += 1
+        self._last_mine = mine
+        self._last_theirs = theirs
+        self.rounds = t + 1
+
+    @property
+    def last_move(self) -> Move:
+        """The opponent's move in the last round; only meaningful once a round was seen."""
+        return _MOVES[self._last_theirs]
+
+    @property
+    def defect_rate(self) -> float:
+        return self.defections / self.rounds if self.rounds else 0.0
+
+    @property
+    def cooperate_rate(self) -> float:
+        return 1.0 - self.defect_rate if self.rounds else 0.0
+
+    @property
+    def window_rounds(self) -> int:
+        return min(self.rounds, self.window)
+
+    @property
+    def window_defect_rate(self) -> float:
+        """Defection rate over the last ``window`` rounds."""
+        size = self.window_rounds
+        return self.window_defections / size if size else 0.0
+
+    @property
+    def change_rate(self) -> float:
+        """Share of round-to-round transitions where the opponent switched moves."""
+        return self.changes / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    @property
+    def cooperation_streak(self) -> int:
+        """Rounds the opponent has cooperated in a row, up to the last one."""
+        return self.streak if self.rounds and not self._last_theirs else 0
+
+    @property
+    def defection_streak(self) -> int:
+        """Rounds the opponent has defected in a row, up to the last one."""
+        return self.streak if self._last_theirs else 0
+
+    @property
+    def mirror_ratio(self) -> float:
+        """Share of rounds after the first where the opponent copied the bot's previous move.
+
+        Close to 1 for tit-for-tat and its relatives.
+        """
+        return self.mirrors / (self.rounds - 1) if self.rounds > 1 else 0.0
+
+    @property
+    def agreement_ratio(self) -> float:
+        """Share of rounds where both sides played the same move."""
+        return (self.outcomes[0] + self.outcomes[3]) / self.rounds if self.rounds else 0.0
+
+    def reply_rate(self, mine: int, theirs: int) -> float:
+        """How often the opponent answered the bot's ``mine`` with ``theirs``.
+
+        ``reply_rate(1, 1)`` is how often a defection was retaliated against.
+        """
+        answered = self.replies[2 * mine] + self.replies[2 * mine + 1]
+        return self.replies[2 * mine + theirs] / answered if answered else 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"OpponentStats(rounds={self.rounds}, defect_rate={self.defect_rate:.3f}, "
+            f"window_defect_rate={self.window_defect_rate:.3f}, streak={self.streak}, "
+            f"outcomes={self.outcomes}, mirror_ratio={self.mirror_ratio:.3f})"
+        )
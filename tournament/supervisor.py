@@ -0,0 +1,215 @@
+"""A process pool that outlives its workers.
+
+``multiprocessing.Pool`` silently replaces a worker that dies, but the task
+that worker held is lost, and the caller waits for it forever. The runner
+uses SupervisedPool instead. It is a ProcessPoolExecutor that is restarted
+whenever a worker dies. Every task that had not come back is submitted
+again, and matches are seeded, so replaying them gives the same results.
+
+A worker dies on purpose when a bot call will not stop after its budget ran
+out (see ``budget``). Before exiting, its watchdog sends a report naming the
+match and the side. A call that holds the GIL keeps the watchdog from running
+at all, so the pool also watches every call's hard deadline in the workers'
+Beacons and kills a worker that is past one. Either way, the caller's
+``settle`` callback turns the report into a replacement task that records the
+forfeit instead of playing the match again.
+"""
+
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing.sharedctypes import RawArray
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import budget
+
+# Worker deaths in a row that no watchdog explained, before giving up.
+MAX_UNEXPLAINED_DEATHS = 3
+# How often the pool looks at the calls in progress, in seconds.
+DEADLINE_POLL = 0.1
+
+Settle = Callable[[Any, budget.Report], Optional[Any]]
+
+_messages: Any = None
+
+
+def _start(
+    messages: Any,
+    beacons: Any,
+    claimed: Any,
+    threads: int,
+    initializer: Callable,
+    initargs: tuple,
+) -> None:
+    global _messages
+    _messages = messages
+    with claimed.get_lock():
+        block = claimed.value
+        claimed.value += 1
+    pid = os.getpid()
+    budget.install_reporter(
+        lambda report: messages.put(("report", pid, report)),
+        beacons[block * threads : (block + 1) * threads],
+    )
+    initializer(*initargs)
+
+
+def _call(fn: Callable, k: int, item: Any) -> Any:
+    _messages.put(("start", os.getpid(), k))
+    return fn(item)
+
+
+class SupervisedPool:
+    """Processes running ``initializer(*initargs)`` once each, replaced when they die.
+
+    ``threads`` is how many metered matches one worker plays at once.
+    """
+
+    def __init__(
+        self,
+        processes: Optional[int],
+        initializer: Callable,
+        initargs: tuple,
+        threads: int = 1,
+    ) -> None:
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.threads = threads
+        self._messages: Any = None
+        self._beacons: Any = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            processes = self.processes or os.cpu_count() or 1
+            # Fresh for every pool: the old workers' Meters died with them,
+            # and one may have been killed holding the queue's lock.
+            if self._messages is not None:
+                self._messages.close()
+            self._messages = multiprocessing.SimpleQueue()
+            self._beacons = RawArray(budget.Beacon, processes * self.threads)
+            self._executor = ProcessPoolExecutor(
+                processes,
+                initializer=_start,
+                initargs=(
+                    self._messages,
+                    self._beacons,
+                    multiprocessing.Value("i", 0),
+                    self.threads,
+                    self.initializer,
+                    self.initargs,
+                ),
+            )
+        return self._executor
+
+    def _read(self, running: Dict[int, int], ended: Dict[int, budget.Report]) -> None:
+        # ``running`` maps each worker's pid to the item it is on, and
+        # ``ended`` each item whose worker exits over a stuck call to why.
+        while not self._messages.empty():
+            kind, pid, message = self._messages.get()
+            if kind == "start":
+                running[pid] = message
+            elif pid in running:
+                ended.setdefault(running[pid], message)
+
+    def _kill_overdue(self, running: Dict[int, int], ended: Dict[int, budget.Report]) -> None:
+        now = time.perf_counter()
+        for beacon in self._beacons:
+            if not beacon.overdue(now) or beacon.pid not in running:
+                continue
+            reason = f"did not return {budget.HARD_SLACK:g}s after its budget ran out"
+            ended.setdefault(running[beacon.pid], beacon.report(reason))
+            try:
+                os.kill(beacon.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+    def _run(
+        self, fn: Callable, items: Iterable[Any], settle: Optional[Settle], failed: Any = None
+    ) -> Iterator[Tuple[int, Any]]:
+        pending: Dict[int, Any] = dict(enumerate(items))
+        unexplained = 0
+        while pending:
+            pool = self._pool()
+            futures: Dict[Future, int] = {
+                pool.submit(_call, fn, k, item): k for k, item in pending.items()
+            }
+            running: Dict[int, int] = {}
+            ended: Dict[int, budget.Report] = {}
+            broken = False
+            while futures and not broken:
+                done, _ = wait(futures, timeout=DEADLINE_POLL, return_when=FIRST_COMPLETED)
+                self._read(running, ended)
+                self._kill_overdue(running, ended)
+                for future in done:
+                    k = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        broken = True
+                        continue
+                    del pending[k]
+                    yield k, result
+            if not broken:
+                continue
+            # Results that arrived before the break are still good.
+            for future, k in futures.items():
+                if future.done() and not future.exception():
+                    del pending[k]
+                    yield k, future.result()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            self._read(running, ended)
+            ended = {k: report for k, report in ended.items() if k in pending}
+            if not ended:
+                unexplained += 1
+                if unexplained >= MAX_UNEXPLAINED_DEATHS:
+                    raise RuntimeError("worker processes keep dying without a report")
+                continue
+            unexplained = 0
+            for k, report in ended.items():
+                if settle is None:
+                    del pending[k]
+                    yield k, failed
+                    continue
+                replacement = settle(pending[k], report)
+                if replacement is None:
+                    raise RuntimeError(f"cannot settle a task over a stuck call: {report}")
+                pending[k] = replacement
+
+    def map(self, fn: Callable, items: Iterable[Any], failed: Any = None) -> List[Any]:
+        """``[fn(item) for item in items]``, computed on the workers.
+
+        An item whose worker exits over a stuck call gives ``failed``.
+        """
+        results = dict(self._run(fn, items, None, failed))
+        return [results[k] for k in range(len(results))]
+
+    def imap_unordered(
+        self, fn: Callable, items: Iterable[Any], settle: Optional[Settle] = None
+    ) -> Iterator[Any]:
+        """``fn(item)`` for every item, yielded as each one finishes.
+
+        When a worker exits over a stuck call, the item it was on is swapped
+        for ``settle(item, report)``. Without ``settle``, its result is None.
+        """
+        for _, result in self._run(fn, items, settle):
+            yield result
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._messages is not None:
+            self._messages.close()
+            self._messages = None
+
+    def __enter__(self) -> "SupervisedPool":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,491 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from ping_game_theory import Strategy
+
+from . import entropy
+from .budget import Budget, Report
+from .cache import ResultCache, result_key
+from .entropy import EntropyPool
+from .executor import map_concurrently
+from .fsm import Machine, MachineBot, compile_strategy, play_machines
+from .history import PackedTrace
+from .instrument import TurnProfile
+from .loader import Entrant
+from .memory import MemoryProfile
+from .match import ROUNDS, MatchResult, StrategyError, forfeit, play_match
+from .rng import match_seed
+from .supervisor import SupervisedPool
+from .traces import TraceKey, TraceWriter
+
+
+@dataclass
+class TournamentResult:
+    names: List[str]
+    rounds: int
+    # matrix[i][j] is the score entrant i earned against entrant j, summed
+    # over repetitions, or None if no repetition of that pairing completed.
+    matrix: List[List[Optional[int]]]
+    seed: int = 0
+    repetitions: int = 1
+    # Probability that any one move is flipped after the bot chose it.
+    noise: float = 0.0
+    # How many (pairing, repetition)s were taken from the result cache.
+    cached: int = 0
+    # Why each forfeited (pairing, repetition) was forfeited, and by whom; the
+    # forfeit scores themselves are in the matrix.
+    errors: Dict[Tuple[int, int, int], str] = field(default_factory=dict)
+    # Per-entrant turn() latency, filled when the tournament is instrumented.
+    profiles: Dict[str, TurnProfile] = field(default_factory=dict)
+    # Per-entrant memory held, filled from the matches sampled for it.
+    memory: Dict[str, MemoryProfile] = field(default_factory=dict)
+
+    def totals(self) -> List[int]:
+        return [sum(s for s in row if s is not None) for row in self.matrix]
+
+    def leaderboard(self) -> List[Tuple[str, int]]:
+        return sorted(zip(self.names, self.totals()), key=lambda item: -item[1])
+
+
+_worker_classes: List[Type[Strategy]] = []
+
+
+def init_worker(entrants: List[Entrant], entropy_pool: str) -> None:
+    """Load every entrant in this process, for compile_entrant and run_pairing."""
+    global _worker_classes
+    _worker_classes = [entrant.load() for entrant in entrants]
+    entropy.install(EntropyPool.attach(entropy_pool))
+
+
+def compile_entrant(task: Tuple[int, int, Optional[Budget]]) -> Optional[Machine]:
+    """The Machine for ``(entrant index, rounds, budget)``, or None (see ``fsm``)."""
+    i, rounds, budget = task
+    return compile_strategy(_worker_classes[i], rounds, limits=budget)
+
+
+def _player(i: int, machine: Optional[Machine]) -> Type[Strategy]:
+    cls = _worker_classes[i]
+    if machine is None:
+        return cls
+    return MachineBot.for_machine(cls.__name__, machine)
+
+
+class Pairing(NamedTuple):
+    """One (pairing, repetition) to play, at every noise level, on a worker."""
+
+    i: int
+    j: int
+    repetition: int
+    # How many repetitions this one match stands for: compiled pairs are
+    # deterministic, so one match covers all of them.
+    copies: int
+    seed: int
+    rounds: int
+    machine_i: Optional[Machine]
+    machine_j: Optional[Machine]
+    instrument: bool
+    profile_every: int
+    record: bool
+    # Trembling-hand noise levels to play this pairing at, all from one seed.
+    noise: Tuple[float, ...]
+    budget: Optional[Budget] = None
+    # Whether to measure the memory each bot holds in this pairing.
+    memory: bool = False
+    # Results already decided per noise level, such as a forfeit over a call
+    # that would not stop; those levels are not played.
+    settled: Tuple[Optional[MatchResult], ...] = ()
+
+
+class Outcome(NamedTuple):
+    """What run_pairing played for one Pairing."""
+
+    task: Pairing
+    # One match per noise level.
+    matches: List[MatchResult]
+    profile_i: Optional[TurnProfile]
+    profile_j: Optional[TurnProfile]
+    trace: Optional[PackedTrace]
+    memory_i: Optional[MemoryProfile]
+    memory_j: Optional[MemoryProfile]
+
+
+def run_pairing(task: Pairing) -> Outcome:
+    """Play ``task`` on a worker set up by init_worker; forfeits are results too."""
+    i, j = task.i, task.j
+    profile_i = profile_j = None
+    if task.instrument:
+        profile_i = TurnProfile(task.profile_every)
+        profile_j = TurnProfile(task.profile_every)
+    memory_i = memory_j = None
+    if task.memory:
+        memory_i = MemoryProfile()
+        memory_j = MemoryProfile()
+    trace = PackedTrace() if task.record else None
+    # Memory is measured and capped on the bots themselves, not their machines.
+    machine_i, machine_j = task.machine_i, task.machine_j
+    if task.memory or (task.budget is not None and task.budget.memory is not None):
+        machine_i = machine_j = None
+    matches: List[MatchResult] = []
+    for level, noise in enumerate(task.noise):
+        if level < len(task.settled) and task.settled[level] is not None:
+            matches.append(task.settled[level])
+            continue
+        # Compiled machines only model bots whose own moves are never flipped.
+        compiled = machine_i is not None and machine_j is not None and not noise
+        try:
+            if compiled:
+                match = play_machines(machine_i, machine_j, task.rounds, trace)
+            else:
+                match = play_match(
+                    _player(i, machine_i if not noise else None),
+                    _player(j, machine_j if not noise else None),
+                    task.rounds,
+                    profile_i,
+                    profile_j,
+                    task.seed,
+                    trace if level == 0 else None,
+                    noise=noise,
+                    budget=task.budget,
+                    memory_a=memory_i,
+                    memory_b=memory_j,
+                )
+        except StrategyError as exc:
+            match = forfeit(exc.side, task.rounds, task.seed, str(exc))
+        matches.append(match)
+    if any(match.forfeit is not None for match in matches):
+        profile_i = profile_j = trace = None
+    return Outcome(task, matches, profile_i, profile_j, trace, memory_i, memory_j)
+
+
+def _run_pairings(batch: Tuple[List[Pairing], int]) -> List[Outcome]:
+    tasks, concurrency = batch
+    return map_concurrently(run_pairing, tasks, concurrency)
+
+
+def settle_pairing(item, report: Report):
+    """SupervisedPool ``settle`` callback for Pairings and batches of them.
+
+    A worker exited over a call that would not stop: swap the task that
+    played it for one that records the forfeit.
+    """
+    label, side, reason = report
+    if label is None:
+        # Not a match of ours, or one whose label the Beacon could not hold.
+        return None
+    seed, noise = label
+    if isinstance(item, Pairing):
+        tasks, concurrency = [item], 0
+    else:
+        tasks, concurrency = item
+    for k, task in enumerate(tasks):
+        if task.seed != seed or noise not in task.noise:
+            continue
+        settled = list(task.settled) or [None] * len(task.noise)
+        settled[task.noise.index(noise)] = forfeit(side, task.rounds, task.seed, reason)
+        task = task._replace(settled=tuple(settled))
+        if not concurrency:
+            return task
+        return tasks[:k] + [task] + tasks[k + 1 :], concurrency
+    return None
+
+
+def pairings(n: int) -> List[Tuple[int, int]]:
+    """Unordered pairings including self-play; (i, j) also fills (j, i)."""
+    return [(i, j) for i in range(n) for j in range(i, n)]
+
+
+def record_matches(
+    results: List[TournamentResult],
+    i: int,
+    j: int,
+    repetition: int,
+    copies: int,
+    matches: Sequence[MatchResult],
+) -> None:
+    """Add one pairing's matches, one per noise level, to ``results``."""
+    for result, match in zip(results, matches):
+        if match.forfeit is not None:
+            loser = result.names[(i, j)[match.forfeit]]
+            result.errors[(i, j, repetition)] = f"{loser} forfeited: {match.reason}"
+        matrix = result.matrix
+        if i != j:
+            matrix[j][i] = (matrix[j][i] or 0) + match.score_b * copies
+        matrix[i][j] = (matrix[i][j] or 0) + match.score_a * copies
+
+
+def _play(
+    entrants: List[Entrant],
+    noise: Tuple[float, ...],
+    rounds: int,
+    processes: Optional[int],
+    compile_bots: bool,
+    instrument: bool,
+    profile_every: int,
+    repetitions: int,
+    seed: int,
+    traces: Optional[Path],
+    cache: Optional[ResultCache],
+    concurrency: int,
+    budget: Optional[Budget],
+    memory_every: int,
+) -> List[TournamentResult]:
+    # One pool, one compilation pass and one set of match seeds for every
+    # noise level; each task plays its pairing at all levels.
+    n = len(entrants)
+    names = [e.name for e in entrants]
+    results = [
+        TournamentResult(names, rounds, [[None] * n for _ in range(n)], seed, repetitions, level)
+        for level in noise
+    ]
+    writer = TraceWriter(traces) if traces is not None else None
+
+    def keys(i: int, j: int, repetition: int) -> List[str]:
+        match = match_seed(seed, names[i], names[j], repetition)
+        return [
+            result_key(entrants[i], entrants[j], rounds, match, level, budget) for level in noise
+        ]
+
+    # Instrumented, measured and traced runs need every match played.
+    cached: Dict[Tuple[int, int, int], List[MatchResult]] = {}
+    if cache is not None and not instrument and not memory_every and writer is None:
+        for i, j in pairings(n):
+            for repetition in range(repetitions):
+                hits = [cache.get(key) for key in keys(i, j, repetition)]
+                if all(hit is not None for hit in hits):
+                    cached[(i, j, repetition)] = hits
+    missing = [
+        (i, j)
+        for i, j in pairings(n)
+        if any((i, j, repetition) not in cached for repetition in range(repetitions))
+    ]
+
+    with EntropyPool.create(seed) as entropy_pool, SupervisedPool(
+        processes, init_worker, (entrants, entropy_pool.name), max(concurrency, 1)
+    ) as pool:
+        machines: List[Optional[Machine]] = [None] * n
+        if compile_bots:
+            needed = sorted({k for pair in missing for k in pair})
+            # A bot that gets stuck while being probed is played uncompiled.
+            compiled = pool.map(compile_entrant, [(i, rounds, budget) for i in needed])
+            for i, machine in zip(needed, compiled):
+                machines[i] = machine
+        tasks = []
+        for i, j in missing:
+            compiled = machines[i] is not None and machines[j] is not None and not any(noise)
+            if compiled:
+                # Deterministic: one match stands for every repetition.
+                for repetition in range(repetitions):
+                    cached.pop((i, j, repetition), None)
+            for repetition in range(1 if compiled else repetitions):
+                if (i, j, repetition) in cached:
+                    continue
+                tasks.append(
+                    Pairing(
+                        i,
+                        j,
+                        repetition,
+                        repetitions if compiled else 1,
+                        match_seed(seed, names[i], names[j], repetition),
+                        rounds,
+                        machines[i],
+                        machines[j],
+                        instrument,
+                        profile_every,
+                        writer is not None,
+                        noise,
+                        budget,
+                        bool(memory_every) and len(tasks) % memory_every == 0,
+                    )
+                )
+        for (i, j, repetition), hits in cached.items():
+            record_matches(results, i, j, repetition, 1, hits)
+        for result in results:
+            result.cached = len(cached)
+        # Timing and memory measurements need the process to themselves.
+        alone = instrument or memory_every or (budget is not None and budget.memory is not None)
+        if concurrency > 1 and not alone:
+            # Neighbouring tasks share a bot, so a slow bot's matches overlap.
+            size = 4 * concurrency
+            batches = [(tasks[k : k + size], concurrency) for k in range(0, len(tasks), size)]
+            outcomes = (
+                outcome
+                for batch in pool.imap_unordered(_run_pairings, batches, settle_pairing)
+                for outcome in batch
+            )
+        else:
+            outcomes = pool.imap_unordered(run_pairing, tasks, settle_pairing)
+        for outcome in outcomes:
+            task = outcome.task
+            i, j = task.i, task.j
+            record_matches(results, i, j, task.repetition, task.copies, outcome.matches)
+            profiles = results[0].profiles
+            for k, profile in ((i, outcome.profile_i), (j, outcome.profile_j)):
+                if profile is not None:
+                    profiles.setdefault(names[k], TurnProfile()).merge(profile)
+            memory = results[0].memory
+            for k, held in ((i, outcome.memory_i), (j, outcome.memory_j)):
+                if held is not None:
+                    memory.setdefault(names[k], MemoryProfile()).merge(held)
+            for repetition in range(task.repetition, task.repetition + task.copies):
+                if cache is not None:
+                    for key, match in zip(keys(i, j, repetition), outcome.matches):
+                        # Budget forfeits depend on the machine's speed.
+                        if budget is None or match.forfeit is None:
+                            cache.put(key, match)
+                if writer is not None and outcome.trace is not None:
+                    key_seed = match_seed(seed, names[i], names[j], repetition)
+                    writer.add(TraceKey(names[i], names[j], repetition, key_seed), outcome.trace)
+    if writer is not None:
+        writer.close()
+    return results
+
+
+def run_tournament(
+    entrants: List[Entrant],
+    rounds: int = ROUNDS,
+    processes: Optional[int] = None,
+    compile_bots: bool = True,
+    instrument: bool = False,
+    profile_every: int = 0,
+    repetitions: int = 1,
+    seed: int = 0,
+    traces: Optional[Path] = None,
+    noise: float = 0.0,
+    cache: Optional[ResultCache] = None,
+    concurrency: int = 1,
+    budget: Optional[Budget] = None,
+    memory_every: int = 0,
+) -> TournamentResult:
+    """Play every pairing on a process pool and fill the payoff matrix.
+
+    Each (pairing, repetition) gets its own seed from ``match_seed``, so any
+    match can be replayed on its own with ``replay`` regardless of which
+    worker played it.
+
+    With ``compile_bots``, deterministic bots are first compiled to finite-state
+    machines (see ``fsm``) and played from lookup tables. With ``instrument``,
+    every turn() call is timed into ``result.profiles`` (see ``instrument``),
+    running every ``profile_every``-th round under cProfile if that is set.
+    With ``traces``, every match's moves are written to a trace store in that
+    directory (see ``traces``). With ``noise``, every move is flipped with that
+    probability after the bot chooses it. With ``cache``, matches already in
+    the cache are not played again, and new results are added to it (see
+    ``cache``); ``result.cached`` counts the reused (pairing, repetition)s.
+    With ``concurrency`` above 1, each worker process keeps that many matches
+    in flight on threads (see ``executor``), so bots that block on I/O do not
+    idle the process. Instrumented runs play one match at a time, so that
+    other matches do not inflate the measured latencies.
+
+    A bot that raises, returns something other than a Move, or goes over
+    ``budget`` (see ``budget``) forfeits that match (see ``match.forfeit``).
+    The forfeit scores go into the matrix, and the reason into
+    ``result.errors``. A worker process that has to exit over a call that
+    will not stop is replaced, and its other matches are played again.
+    With ``memory_every``, every ``memory_every``-th match played also
+    measures the memory each bot holds into ``result.memory`` (see
+    ``memory``).
+    """
+    return _play(
+        entrants,
+        (noise,),
+        rounds,
+        processes,
+        compile_bots,
+        instrument,
+        profile_every,
+        repetitions,
+        seed,
+        traces,
+        cache,
+        concurrency,
+        budget,
+        memory_every,
+    )[0]
+
+
+def noise_sweep(
+    entrants: List[Entrant],
+    noise: Sequence[float],
+    rounds: int = ROUNDS,
+    processes: Optional[int] = None,
+    compile_bots: bool = True,
+    instrument: bool = False,
+    profile_every: int = 0,
+    repetitions: int = 1,
+    seed: int = 0,
+    cache: Optional[ResultCache] = None,
+    concurrency: int = 1,
+    budget: Optional[Budget] = None,
+    memory_every: int = 0,
+) -> Dict[float, TournamentResult]:
+    """``run_tournament`` at every noise level in ``noise``, as one job.
+
+    Entrants are loaded and compiled once, and every level replays the same
+    matches with the same seeds: bots draw the same random numbers, and a
+    move flipped at one level is flipped at every higher level too. Score
+    differences between levels therefore come from the noise alone, not from
+    sampling. Profiles, if requested, cover all levels and are attached to
+    the first level's result.
+    """
+    levels = tuple(noise)
+    results = _play(
+        entrants,
+        levels,
+        rounds,
+        processes,
+        compile_bots,
+        instrument,
+        profile_every,
+        repetitions,
+        seed,
+        None,
+        cache,
+        concurrency,
+        budget,
+        memory_every,
+    )
+    return dict(zip(levels, results))
+
+
+def replay(
+    entrants: List[Entrant],
+    name_a: str,
+    name_b: str,
+    rounds: int = ROUNDS,
+    seed: int = 0,
+    repetition: int = 0,
+    noise: float = 0.0,
+    budget: Optional[Budget] = None,
+) -> MatchResult:
+    """Replay one match of ``run_tournament(entrants, seed=seed, noise=noise)`` in-process.
+
+    Scores, and the side of a forfeit, come back in the order the names were
+    given.
+    """
+    names = [e.name for e in entrants]
+    i, j = names.index(name_a), names.index(name_b)
+    swapped = i > j
+    if swapped:
+        i, j = j, i
+    pair_seed = match_seed(seed, names[i], names[j], repetition)
+    with EntropyPool.create(seed) as pool:
+        entropy.install(pool)
+        try:
+            match = play_match(
+                entrants[i].load(),
+                entrants[j].load(),
+                rounds,
+                seed=pair_seed,
+                noise=noise,
+                budget=budget,
+            )
+        except StrategyError as exc:
+            match = forfeit(exc.side, rounds, pair_seed, str(exc))
+        finally:
+            entropy.install(None)
+    if swapped:
+        match.score_a, match.score_b = match.score_b, match.score_a
+        if match.forfeit is not None:
+            match.forfeit = 1 - match.forfeit
+    return match
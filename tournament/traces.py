@@ -0,0 +1,423 @@
+"""Compact on-disk store of every move of every match in a tournament.
+
+A match trace is a PackedTrace (see ``history``): 2 bits per round, so a
+10,000 round match is 2,500 bytes rather than megabytes of HistoryEntry
+objects. Matches that settle into long stretches of identical rounds, such
+as always-defect against always-defect, are stored run-length encoded
+instead, whichever is smaller. A store is a directory holding the
+concatenated traces in ``traces.bin`` and an index in ``index.json`` that
+maps each (bot A, bot B, repetition, seed) to its byte range and encoding.
+Identical traces, such as the repeated matches of two deterministic bots,
+are stored once.
+
+Readers memory-map ``traces.bin``, so opening a store costs nothing per
+round, and every Trace is a zero-copy window into the map, usable until the
+store is closed. Aggregates work on runs of identical rounds: scores,
+cooperation counts, cumulative score series and windowed cooperation rates
+cost O(runs) on run-length encoded traces::
+
+    store = TraceStore("traces/")
+    trace = store.get("Arnav_an752.Bot", "AnirudhTata_at612.Bot")
+    trace.scores(), trace.cooperation_rates(100)
+"""
+
+import bisect
+import json
+import mmap
+import os
+import re
+import weakref
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from .history import PackedTrace
+from .match import MOVES, PAYOFFS
+
+FORMAT = 2
+DATA_FILE = "traces.bin"
+INDEX_FILE = "index.json"
+
+PACKED = "packed"
+RLE = "rle"
+
+
+class TraceKey(NamedTuple):
+    bot_a: str
+    bot_b: str
+    repetition: int
+    seed: int
+
+
+class Run(NamedTuple):
+    """``length`` consecutive rounds in which the two sides played the same moves."""
+
+    move_a: int
+    move_b: int
+    length: int
+
+
+class _Entry(NamedTuple):
+    offset: int
+    length: int
+    rounds: int
+    # Format 1 stores only wrote packed traces.
+    encoding: str = PACKED
+
+
+# A round's code is 2 * move_a + move_b; swapping the sides swaps the bits.
+_SWAP = (0, 2, 1, 3)
+
+
+def _code_table(per_round) -> List[Tuple[int, int]]:
+    return [per_round(code >> 1, code & 1) for code in range(4)]
+
+
+def _byte_table(code_table: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    # For every byte value, the sum of the code table over its four rounds.
+    table = []
+    for value in range(256):
+        codes = [value >> (2 * slot) & 3 for slot in range(4)]
+        table.append(
+            (sum(code_table[c][0] for c in codes), sum(code_table[c][1] for c in codes))
+        )
+    return table
+
+
+_CODE_SCORES = _code_table(lambda a, b: PAYOFFS[MOVES[a]][MOVES[b]])
+_CODE_COOPERATIONS = _code_table(lambda a, b: (1 - a, 1 - b))
+_SCORES = _byte_table(_CODE_SCORES)
+_COOPERATIONS = _byte_table(_CODE_COOPERATIONS)
+
+# Bytes whose four rounds all have the same code.
+_UNIFORM = {0x00: 0, 0x55: 1, 0xAA: 2, 0xFF: 3}
+_REPEATS = re.compile(rb"(.)\1*", re.S)
+
+
+def _packed_runs(data: Union[bytes, memoryview], rounds: int) -> List[Tuple[int, int]]:
+    """``(code, length)`` runs of packed bytes, scanning repeated bytes in C."""
+    runs: List[List[int]] = []
+
+    def extend(code: int, length: int) -> None:
+        if runs and runs[-1][0] == code:
+            runs[-1][1] += length
+        else:
+            runs.append([code, length])
+
+    for match in _REPEATS.finditer(data):
+        value = data[match.start()]
+        count = match.end() - match.start()
+        code = _UNIFORM.get(value)
+        if code is not None:
+            extend(code, 4 * count)
+            continue
+        for _ in range(count):
+            for slot in range(4):
+                extend(value >> (2 * slot) & 3, 1)
+    # Drop the padding rounds of the last byte.
+    excess = 4 * len(data) - rounds
+    while excess:
+        take = min(excess, runs[-1][1])
+        runs[-1][1] -= take
+        excess -= take
+        if not runs[-1][1]:
+            runs.pop()
+    return [(code, length) for code, length in runs]
+
+
+def encode_runs(trace: PackedTrace) -> bytes:
+    """Run-length encoding of a trace: one LEB128 varint ``length << 2 | code`` per run."""
+    out = bytearray()
+    for code, length in _packed_runs(trace.data, trace.rounds):
+        value = length << 2 | code
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _decode_runs(data: Union[bytes, memoryview]) -> List[Tuple[int, int]]:
+    runs = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        runs.append((value & 3, value >> 2))
+        value = shift = 0
+    return runs
+
+
+class Trace:
+    """Read-only moves of one match in packed form, seen from side ``a`` of its key.
+
+    ``data`` is the packed bytes (any buffer); ``swapped`` exchanges the two
+    sides, for looking a match up with its bots in the other order.
+    """
+
+    __slots__ = ("data", "rounds", "swapped", "_codes")
+
+    def __init__(self, data: Union[bytes, memoryview], rounds: int, swapped: bool = False) -> None:
+        self.data = data
+        self.rounds = rounds
+        self.swapped = swapped
+        self._codes: Optional[List[Tuple[int, int]]] = None
+
+    def __len__(self) -> int:
+        return self.rounds
+
+    def _index(self, t: int) -> int:
+        if t < 0:
+            t += self.rounds
+        if not 0 <= t < self.rounds:
+            raise IndexError("Trace index out of range")
+        return t
+
+    def _code(self, t: int) -> int:
+        return self.data[t >> 2] >> ((t & 3) << 1) & 3
+
+    def __getitem__(self, t: int) -> Tuple[int, int]:
+        """``(move_a, move_b)`` of round ``t``, encoded as 0 (C) / 1 (D)."""
+        code = self._code(self._index(t))
+        if self.swapped:
+            return code & 1, code >> 1
+        return code >> 1, code & 1
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        for run in self.runs():
+            pair = (run.move_a, run.move_b)
+            for _ in range(run.length):
+                yield pair
+
+    def moves(self, side: int = 0) -> List[int]:
+        return [pair[side] for pair in self]
+
+    def _run_codes(self) -> List[Tuple[int, int]]:
+        # (code, length) runs as stored, before any swap.
+        if self._codes is None:
+            self._codes = _packed_runs(self.data, self.rounds)
+        return self._codes
+
+    def runs(self) -> List[Run]:
+        swap = _SWAP if self.swapped else (0, 1, 2, 3)
+        return [
+            Run(swap[code] >> 1, swap[code] & 1, length) for code, length in self._run_codes()
+        ]
+
+    def _totals(self, table: List[Tuple[int, int]]) -> Tuple[int, int]:
+        total_a = total_b = 0
+        for value, count in Counter(self.data).items():
+            x, y = table[value]
+            total_a += x * count
+            total_b += y * count
+        # Padding rounds in the last byte decode as mutual cooperation.
+        padding = 4 * len(self.data) - self.rounds
+        x, y = table[0]
+        total_a -= x // 4 * padding
+        total_b -= y // 4 * padding
+        return (total_b, total_a) if self.swapped else (total_a, total_b)
+
+    def scores(self) -> Tuple[int, int]:
+        return self._totals(_SCORES)
+
+    def cooperations(self, side: int = 0) -> int:
+        return self._totals(_COOPERATIONS)[side]
+
+    def cumulative_scores(self) -> List[Tuple[int, int, int]]:
+        """``(round, score_a, score_b)`` after the last round of every run.
+
+        Scores grow linearly within a run, so this is the whole series.
+        """
+        points = []
+        t = score_a = score_b = 0
+        for run in self.runs():
+            payoff_a, payoff_b = _CODE_SCORES[2 * run.move_a + run.move_b]
+            t += run.length
+            score_a += payoff_a * run.length
+            score_b += payoff_b * run.length
+            points.append((t, score_a, score_b))
+        return points
+
+    def cooperation_rates(self, window: int, side: int = 0) -> List[float]:
+        """Cooperation rate of ``side`` over consecutive ``window``-round windows.
+
+        The last window may be shorter. Costs O(runs + windows).
+        """
+        rates = []
+        filled = cooperations = 0
+        for run in self.runs():
+            cooperates = 1 - run[side]
+            remaining = run.length
+            while remaining:
+                take = min(remaining, window - filled)
+                filled += take
+                cooperations += cooperates * take
+                remaining -= take
+                if filled == window:
+                    rates.append(cooperations / window)
+                    filled = cooperations = 0
+        if filled:
+            rates.append(cooperations / filled)
+        return rates
+
+    def array(self):
+        """The moves as a ``(rounds, 2)`` uint8 NumPy array (requires numpy)."""
+        import numpy as np
+
+        codes = np.frombuffer(self.data, dtype=np.uint8)
+        codes = (codes[:, None] >> np.arange(0, 8, 2, dtype=np.uint8) & 3).reshape(-1)
+        codes = codes[: self.rounds]
+        moves = np.stack((codes >> 1, codes & 1), axis=1)
+        return moves[:, ::-1] if self.swapped else moves
+
+
+class RunTrace(Trace):
+    """A Trace stored run-length encoded (see ``encode_runs``).
+
+    Everything but single-round lookup costs O(runs); lookup is a binary
+    search over run ends.
+    """
+
+    __slots__ = ("_ends",)
+
+    def __init__(self, data: Union[bytes, memoryview], rounds: int, swapped: bool = False) -> None:
+        super().__init__(data, rounds, swapped)
+        self._ends: Optional[List[int]] = None
+
+    def _run_codes(self) -> List[Tuple[int, int]]:
+        if self._codes is None:
+            self._codes = _decode_runs(self.data)
+        return self._codes
+
+    def _code(self, t: int) -> int:
+        if self._ends is None:
+            self._ends = []
+            end = 0
+            for _, length in self._run_codes():
+                end += length
+                self._ends.append(end)
+        return self._run_codes()[bisect.bisect_right(self._ends, t)][0]
+
+    def _totals(self, table: List[Tuple[int, int]]) -> Tuple[int, int]:
+        # ``table`` is per byte; byte 0x55 * code is four rounds of ``code``.
+        total_a = total_b = 0
+        for code, length in self._run_codes():
+            x, y = table[0x55 * code]
+            total_a += x * length
+            total_b += y * length
+        total_a //= 4
+        total_b //= 4
+        return (total_b, total_a) if self.swapped else (total_a, total_b)
+
+    def array(self):
+        import numpy as np
+
+        codes = np.array(self._run_codes(), dtype=np.int64).reshape(-1, 2)
+        codes = np.repeat(codes[:, 0].astype(np.uint8), codes[:, 1])
+        moves = np.stack((codes >> 1, codes & 1), axis=1)
+        return moves[:, ::-1] if self.swapped else moves
+
+
+class TraceWriter:
+    """Writes a new store into ``directory``, replacing any store there."""
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._data = open(self.directory / DATA_FILE, "wb")
+        self._index: Dict[TraceKey, _Entry] = {}
+        self._offsets: Dict[Tuple[str, bytes], int] = {}
+        self._size = 0
+
+    def add(self, key: TraceKey, trace: PackedTrace) -> None:
+        encoding, data = PACKED, bytes(trace.data)
+        runs = encode_runs(trace)
+        if len(runs) < len(data):
+            encoding, data = RLE, runs
+        offset = self._offsets.get((encoding, data))
+        if offset is None:
+            offset = self._offsets[encoding, data] = self._size
+            self._data.write(data)
+            self._size += len(data)
+        self._index[key] = _Entry(offset, len(data), trace.rounds, encoding)
+
+    def close(self) -> None:
+        self._data.close()
+        index = {
+            "format": FORMAT,
+            "traces": [[*key, *entry] for key, entry in self._index.items()],
+        }
+        (self.directory / INDEX_FILE).write_text(json.dumps(index))
+
+    def __enter__(self) -> "TraceWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class TraceStore:
+    """Memory-mapped reader for a store written by TraceWriter."""
+
+    def __init__(self, directory: Union[str, Path]) -> None:
+        self.directory = Path(directory)
+        index = json.loads((self.directory / INDEX_FILE).read_text())
+        if index.get("format") not in (1, FORMAT):
+            raise ValueError(f"{self.directory} has unsupported trace format {index.get('format')}")
+        self.index: Dict[TraceKey, _Entry] = {
+            TraceKey(*row[:4]): _Entry(*row[4:]) for row in index["traces"]
+        }
+        # (bot_a, bot_b, repetition) in either order, to the key stored for it.
+        self._pairs: Dict[Tuple[str, str, int], TraceKey] = {}
+        for key in self.index:
+            self._pairs.setdefault((key.bot_a, key.bot_b, key.repetition), key)
+            self._pairs.setdefault((key.bot_b, key.bot_a, key.repetition), key)
+        # Windows handed out in traces, released before the map is closed.
+        self._windows: "weakref.WeakValueDictionary[int, memoryview]" = (
+            weakref.WeakValueDictionary()
+        )
+        self._map: Optional[mmap.mmap] = None
+        self._view = memoryview(b"")
+        path = self.directory / DATA_FILE
+        if os.path.getsize(path):
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __iter__(self) -> Iterator[TraceKey]:
+        return iter(self.index)
+
+    def _trace(self, entry: _Entry, swapped: bool) -> Trace:
+        data = self._view[entry.offset : entry.offset + entry.length]
+        self._windows[id(data)] = data
+        cls = RunTrace if entry.encoding == RLE else Trace
+        return cls(data, entry.rounds, swapped)
+
+    def __getitem__(self, key: TraceKey) -> Trace:
+        return self._trace(self.index[key], False)
+
+    def get(self, bot_a: str, bot_b: str, repetition: int = 0) -> Trace:
+        """The trace of ``bot_a`` vs ``bot_b``, seen from ``bot_a``, in either order."""
+        key = self._pairs.get((bot_a, bot_b, repetition))
+        if key is None:
+            raise KeyError((bot_a, bot_b, repetition))
+        return self._trace(self.index[key], swapped=key.bot_a != bot_a)
+
+    def close(self) -> None:
+        """Unmap the store. Traces read from it can no longer be used."""
+        for window in list(self._windows.values()):
+            window.release()
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+
+    def __enter__(self) -> "TraceStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
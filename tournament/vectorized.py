@@ -0,0 +1,214 @@
+"""Batch engine for memory-one strategies, simulated as NumPy arrays.
+
+A memory-one strategy is fully described by the probability that it defects
+on the first round and after each joint outcome of the previous round. That
+covers always-defect, tit-for-tat and win-stay-lose-shift, which several
+submissions reduce to. Matches are laid out along the first array axis, so
+thousands of them advance together, one vectorized step per round, with
+random draws made in blocks over both the round and the match axis.
+
+Moves are encoded as 0 for COOPERATE and 1 for DEFECT. Requires numpy.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+
+import numpy as np
+
+from ping_game_theory import History, Move, Strategy
+
+from .fsm import Machine, compile_strategy
+from .loader import SUBMISSIONS_DIR, discover_strategies
+from .match import MOVE_BITS, MOVES, PAYOFFS, ROUNDS
+
+# PAYOFF[mine, theirs] is the score for my move against theirs.
+PAYOFF = np.array(
+    [[PAYOFFS[MOVES[i]][MOVES[j]][0] for j in range(2)] for i in range(2)],
+    dtype=np.int64,
+)
+
+_BLOCK = 1024
+
+
+@dataclass(frozen=True)
+class TableStrategy:
+    """A memory-one strategy.
+
+    ``table`` holds P(defect) after CC, CD, DC and DD, where the first letter
+    is this strategy's previous move and the second the opponent's.
+    """
+
+    name: str
+    first: float
+    table: Tuple[float, float, float, float]
+
+    @property
+    def deterministic(self) -> bool:
+        return all(p in (0.0, 1.0) for p in (self.first, *self.table))
+
+
+def table_bot(strategy: TableStrategy) -> Type[Strategy]:
+    """A deterministic TableStrategy as a bot for the match engine."""
+    if not strategy.deterministic:
+        raise ValueError(f"{strategy.name} is not deterministic")
+    first = MOVES[int(strategy.first)]
+    table = [MOVES[int(p)] for p in strategy.table]
+
+    class TableBot(Strategy):
+        def begin(self) -> Move:
+            return first
+
+        def turn(self, history: History) -> Move:
+            last = history[-1]
+            return table[2 * MOVE_BITS[last.self] + MOVE_BITS[last.other]]
+
+    TableBot.__name__ = TableBot.__qualname__ = strategy.name
+    return TableBot
+
+
+ALWAYS_COOPERATE = TableStrategy("always-cooperate", 0.0, (0.0, 0.0, 0.0, 0.0))
+ALWAYS_DEFECT = TableStrategy("always-defect", 1.0, (1.0, 1.0, 1.0, 1.0))
+TIT_FOR_TAT = TableStrategy("tit-for-tat", 0.0, (0.0, 1.0, 0.0, 1.0))
+WIN_STAY_LOSE_SHIFT = TableStrategy("win-stay-lose-shift", 0.0, (0.0, 1.0, 1.0, 0.0))
+
+def table_of(name: str, machine: Machine) -> Optional[TableStrategy]:
+    """The memory-one table a compiled machine plays, or None if it needs more.
+
+    A machine is memory-one when its next move depends only on its own move
+    and the opponent's move in the last round. A row the machine never reaches,
+    such as "after I cooperated" for always-defect, copies the row for its
+    other move with the same opponent move; it only matters when the bot's
+    own moves are flipped by noise.
+    """
+    moves: Dict[Tuple[int, int], int] = {}
+    seen = set()
+    states = [0]
+    while states:
+        state = states.pop()
+        if state in seen:
+            continue
+        seen.add(state)
+        for theirs in (0, 1):
+            after = machine.transitions[state][theirs]
+            move = moves.setdefault((machine.outputs[state], theirs), machine.outputs[after])
+            if move != machine.outputs[after]:
+                return None
+            states.append(after)
+    table = tuple(
+        float(moves.get((mine, theirs), moves.get((1 - mine, theirs))))
+        for mine in (0, 1)
+        for theirs in (0, 1)
+    )
+    return TableStrategy(name, float(machine.outputs[0]), table)
+
+
+def submission_tables(
+    directory: Path = SUBMISSIONS_DIR, rounds: int = ROUNDS
+) -> Dict[str, TableStrategy]:
+    """Submissions whose play is exactly a memory-one table, by entrant name.
+
+    Each bot is compiled (see ``fsm``), which checks the machine against the
+    real bot, so the tables follow the submissions as they change.
+    """
+    tables = {}
+    for entrant in discover_strategies(directory):
+        machine = compile_strategy(entrant.load(), rounds)
+        table = table_of(entrant.name, machine) if machine is not None else None
+        if table is not None:
+            tables[entrant.name] = table
+    return tables
+
+
+@dataclass
+class BatchResult:
+    # scores[k] is (score of a, score of b) in match k.
+    scores: np.ndarray
+    # moves[k, t] is (move of a, move of b) in round t of match k, if kept.
+    moves: Optional[np.ndarray] = None
+
+
+def stack_tables(strategies: Sequence[TableStrategy]) -> Tuple[np.ndarray, np.ndarray]:
+    """``(first, table)`` arrays of the strategies, one row per match."""
+    first = np.array([s.first for s in strategies], dtype=np.float64)
+    table = np.array([s.table for s in strategies], dtype=np.float64)
+    return first, table
+
+
+def play_batch(
+    strategies_a: Sequence[TableStrategy],
+    strategies_b: Sequence[TableStrategy],
+    rounds: int = ROUNDS,
+    noise: float = 0.0,
+    seed: Optional[int] = None,
+    keep_moves: bool = False,
+) -> BatchResult:
+    """Play match k between ``strategies_a[k]`` and ``strategies_b[k]`` for all k.
+
+    With ``noise`` > 0 every move is flipped with that probability after the
+    strategy has chosen it.
+    """
+    if len(strategies_a) != len(strategies_b):
+        raise ValueError("strategies_a and strategies_b must have the same length")
+    m = len(strategies_a)
+    first_a, table_a = stack_tables(strategies_a)
+    first_b, table_b = stack_tables(strategies_b)
+    stochastic = not all(s.deterministic for s in (*strategies_a, *strategies_b))
+    rng = np.random.default_rng(seed)
+    rows = np.arange(m)
+
+    scores = np.zeros((m, 2), dtype=np.int64)
+    moves = np.empty((m, rounds, 2), dtype=np.uint8) if keep_moves else None
+    a = b = None
+    for block_start in range(0, rounds, _BLOCK):
+        block = min(_BLOCK, rounds - block_start)
+        draws = rng.random((block, 2, m)) if stochastic else np.full((block, 2, m), 0.5)
+        flips = rng.random((block, 2, m)) < noise if noise > 0 else None
+        for i in range(block):
+            if a is None:
+                p_a, p_b = first_a, first_b
+            else:
+                p_a = table_a[rows, 2 * a + b]
+                p_b = table_b[rows, 2 * b + a]
+            a = (draws[i, 0] < p_a).astype(np.intp)
+            b = (draws[i, 1] < p_b).astype(np.intp)
+            if flips is not None:
+                a ^= flips[i, 0]
+                b ^= flips[i, 1]
+            scores[:, 0] += PAYOFF[a, b]
+            scores[:, 1] += PAYOFF[b, a]
+            if moves is not None:
+                moves[:, block_start + i, 0] = a
+                moves[:, block_start + i, 1] = b
+    return BatchResult(scores, moves)
+
+
+def table_tournament(
+    strategies: Sequence[TableStrategy],
+    rounds: int = ROUNDS,
+    repetitions: int = 1,
+    noise: float = 0.0,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """Mean payoff matrix over ``repetitions`` of every pairing, in one batch.
+
+    ``result[i, j]`` is the mean score of ``strategies[i]`` against
+    ``strategies[j]``.
+    """
+    n = len(strategies)
+    pairs: List[Tuple[int, int]] = [(i, j) for i in range(n) for j in range(i, n)]
+    index = np.repeat(np.array(pairs, dtype=np.intp).reshape(-1, 2), repetitions, axis=0)
+    batch = play_batch(
+        [strategies[i] for i in index[:, 0]],
+        [strategies[j] for j in index[:, 1]],
+        rounds,
+        noise,
+        seed,
+    )
+    totals = np.zeros((n, n), dtype=np.float64)
+    np.add.at(totals, (index[:, 0], index[:, 1]), batch.scores[:, 0])
+    np.add.at(totals, (index[:, 1], index[:, 0]), batch.scores[:, 1])
+    # Self-play added both players' scores to the diagonal.
+    counts = np.full((n, n), float(repetitions))
+    counts[np.diag_indices(n)] *= 2
+    return totals / counts